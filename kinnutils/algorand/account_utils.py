@@ -19,7 +19,7 @@ from algosdk.error import IndexerHTTPError
 from core.factory import AccountFactory
 from core.accounts_base import AccountBase
 
-from algorand.algoconn import IndexerBase, get_algod
+from algorand.algoconn import IndexerBase, get_algod, get_context
 from decorators import retry
 
 logger = structlog.get_logger()
@@ -30,10 +30,10 @@ class Account(AccountBase, IndexerBase):
     _pk = None
     _sk = None
 
-    def __init__(self, mnmc=None, algocli=None, pk=None, testnet=False, interactive=False):
-        IndexerBase.__init__(self, testnet=testnet)
+    def __init__(self, mnmc=None, algocli=None, pk=None, testnet=False, interactive=False, context=None):
+        IndexerBase.__init__(self, testnet=testnet, context=context)
         if algocli is None:
-            self.algodcli = get_algod(testnet=testnet)
+            self.algodcli = (context or get_context(testnet)).algod
         else:
             self.algodcli = algocli
 
@@ -74,33 +74,23 @@ class Account(AccountBase, IndexerBase):
     def info(self):
         try:
             info = self.indexer.account_info(self.pk, exclude="all")
-            self.use_fallback = False
         except IndexerHTTPError as e:
             if "no accounts found for address" in str(e):
                 return {}
             else:
-                self.use_fallback = True
                 raise e
 
         return info
 
     @retry(IndexerHTTPError, tries=4, delay=1, backoff=1, logger=logger)
     def _get_account_assets_page(self, next_token=None):
-        try:
-            return self.indexer.lookup_account_assets(self.pk, next_page=next_token)
-        except IndexerHTTPError as e:
-            self.use_fallback = True
-            raise e
+        return self.indexer.lookup_account_assets(self.pk, next_page=next_token)
 
     @retry(IndexerHTTPError, tries=4, delay=1, backoff=1, logger=logger)
     def _get_created_assets_page(self, next_token=None):
-        try:
-            return self.indexer.lookup_account_asset_by_creator(
-                self.pk, next_page=next_token
-            )
-        except IndexerHTTPError as e:
-            self.use_fallback = True
-            raise e
+        return self.indexer.lookup_account_asset_by_creator(
+            self.pk, next_page=next_token
+        )
 
     def params(self):
         params = self.algodcli.suggested_params()
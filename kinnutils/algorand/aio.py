@@ -0,0 +1,225 @@
+"""This module provides an asyncio counterpart of IndexerBase, for driving
+thousands of concurrent indexer lookups from a single event loop.
+
+Requires the optional ``aiohttp`` dependency, ``pip install kinnutils[async]``.
+"""
+import json
+import time
+import asyncio
+import structlog
+
+from algosdk import constants
+from algosdk.error import IndexerHTTPError
+
+from algorand.algoconn import get_indexer_pool, is_endpoint_fault
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+LOGGER = structlog.get_logger()
+
+
+class AsyncIndexerBase:
+    """
+    asyncio variant of IndexerBase.
+
+    Requests are routed with the same IndexerPool as the blocking clients,
+    so endpoint health, circuit breaking and the shared rate limiters apply
+    unchanged, but are sent over one pooled aiohttp session. Use it as an
+    async context manager, or call ``close`` when done.
+    """
+
+    def __init__(
+        self,
+        indexer=None,
+        backup=None,
+        testnet=False,
+        pool=None,
+        connections=100,
+        timeout=30,
+        tries=3,
+    ):
+        """
+        :param indexer: IndexerClient whose address and token are used for
+            the primary endpoint
+        :param backup: IndexerClient used for the fallback endpoint
+        :param pool: ready made IndexerPool of IndexerClients to route with
+        :param connections: maximum number of open connections
+        :param timeout: total timeout of a single request, in seconds
+        :param tries: endpoints tried per request before giving up
+        """
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncIndexerBase requires aiohttp, install kinnutils[async]"
+            )
+
+        if pool is None:
+            pool = get_indexer_pool(indexer=indexer, backup=backup, testnet=testnet)
+        self.pool = pool
+        self.connections = connections
+        self.timeout = timeout
+        self.tries = tries
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(self, path, params=None):
+        """
+        Performs a GET against the healthiest endpoint of the pool, moving on
+        to another endpoint on endpoint faults.
+
+        :return: dict loaded from the json response body
+        """
+        query = {k: v for k, v in (params or {}).items() if v is not None}
+        for attempt in range(1, self.tries + 1):
+            endpoint = self.pool.choose()
+            if endpoint.bucket is not None:
+                await asyncio.sleep(endpoint.bucket.reserve())
+
+            start = time.monotonic()
+            try:
+                result = await self._get(endpoint.client, path, query)
+            except (IndexerHTTPError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if isinstance(e, IndexerHTTPError) and not is_endpoint_fault(e):
+                    self.pool.record_success(endpoint, time.monotonic() - start)
+                    raise e
+                self.pool.record_failure(endpoint, exception=e)
+                if attempt == self.tries:
+                    raise e
+                LOGGER.warning(
+                    "Async indexer request failed, retrying",
+                    endpoint=endpoint.name,
+                    exception=type(e).__name__,
+                )
+                continue
+
+            self.pool.record_success(endpoint, time.monotonic() - start)
+            return result
+
+    async def _get(self, client, path, query):
+        headers = {"User-Agent": "py-algorand-sdk"}
+        if client.headers:
+            headers.update(client.headers)
+        if client.indexer_token:
+            headers[constants.indexer_auth_header] = client.indexer_token
+
+        url = f"{str(client.indexer_address).rstrip('/')}/v2{path}"
+        async with self.session.get(url, params=query, headers=headers) as resp:
+            if resp.status >= 400:
+                message = await resp.text()
+                try:
+                    message = json.loads(message)["message"]
+                except (ValueError, KeyError, TypeError):
+                    pass
+                raise IndexerHTTPError(message or resp.reason)
+            return await resp.json(content_type=None)
+
+    async def block_info(self, round_num, header_only=None):
+        return await self._request(
+            f"/blocks/{round_num}",
+            {"header-only": "true" if header_only else None},
+        )
+
+    async def search_assets(
+        self,
+        limit=None,
+        next_page=None,
+        creator=None,
+        name=None,
+        unit=None,
+        asset_id=None,
+        include_all=False,
+    ):
+        return await self._request(
+            "/assets",
+            {
+                "limit": limit,
+                "next": next_page,
+                "creator": creator,
+                "name": name,
+                "unit": unit,
+                "asset-id": asset_id,
+                "include-all": "true" if include_all else None,
+            },
+        )
+
+    async def search_asset_transactions(
+        self,
+        asset_id,
+        limit=None,
+        next_page=None,
+        txn_type=None,
+        min_round=None,
+        max_round=None,
+        address=None,
+        address_role=None,
+        start_time=None,
+        end_time=None,
+    ):
+        return await self._request(
+            f"/assets/{asset_id}/transactions",
+            {
+                "limit": limit,
+                "next": next_page,
+                "tx-type": txn_type,
+                "min-round": min_round,
+                "max-round": max_round,
+                "address": address,
+                "address-role": address_role,
+                "after-time": start_time,
+                "before-time": end_time,
+            },
+        )
+
+    async def asset_balances(
+        self,
+        asset_id,
+        limit=None,
+        next_page=None,
+        min_balance=None,
+        max_balance=None,
+        include_all=False,
+    ):
+        return await self._request(
+            f"/assets/{asset_id}/balances",
+            {
+                "limit": limit,
+                "next": next_page,
+                "currency-greater-than": min_balance,
+                "currency-less-than": max_balance,
+                "include-all": "true" if include_all else None,
+            },
+        )
+
+    async def lookup_account_assets(
+        self, address, limit=None, next_page=None, asset_id=None, include_all=False
+    ):
+        return await self._request(
+            f"/accounts/{address}/assets",
+            {
+                "limit": limit,
+                "next": next_page,
+                "asset-id": asset_id,
+                "include-all": "true" if include_all else None,
+            },
+        )
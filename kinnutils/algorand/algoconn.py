@@ -1,14 +1,156 @@
 import os
+import time
+import random
 import logging
+import threading
 import configparser
+import structlog
+import requests
+from urllib.error import URLError
 
+from algosdk import constants
 from algosdk.v2client import algod as algodv2
 from algosdk.v2client import indexer
+from algosdk.error import AlgodHTTPError, AlgodResponseError, IndexerHTTPError
 
 from core.settings import settings
+from utils.http import SessionPool
+from utils.ratelimit import get_bucket
 
+LOGGER = structlog.get_logger()
 
-def get_algod(testnet=False):
+
+class RateLimitedClient:
+    """Proxy which takes a token from ``bucket`` before every client call."""
+
+    def __init__(self, client, bucket):
+        self.client = client
+        self.bucket = bucket
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if not callable(attr):
+            return attr
+
+        def limited(*args, **kwargs):
+            self.bucket.acquire()
+            return attr(*args, **kwargs)
+
+        return limited
+
+
+REQUEST_TIMEOUT = 30
+""" Seconds before a pooled indexer or algod request times out """
+
+
+def _error_message(resp):
+    try:
+        return resp.json()["message"]
+    except (ValueError, KeyError, TypeError):
+        return resp.text
+
+
+class SessionIndexerClient(indexer.IndexerClient):
+    """
+    IndexerClient which sends its requests over a shared requests Session or
+    SessionPool, reusing pooled keep-alive connections instead of opening
+    one per call.
+    """
+
+    def __init__(self, indexer_token, indexer_address, headers=None, session=None):
+        indexer.IndexerClient.__init__(self, indexer_token, indexer_address, headers)
+        self.session = session if session is not None else requests.Session()
+
+    def indexer_request(self, method, requrl, params=None, data=None, headers=None):
+        header = {"User-Agent": "py-algorand-sdk"}
+        if self.headers:
+            header.update(self.headers)
+        if headers:
+            header.update(headers)
+        if (requrl not in constants.no_auth) and self.indexer_token:
+            header[constants.indexer_auth_header] = self.indexer_token
+        if requrl not in constants.unversioned_paths:
+            requrl = indexer.api_version_path_prefix + requrl
+
+        resp = self.session.request(
+            method,
+            self.indexer_address + requrl,
+            params=params,
+            data=data,
+            headers=header,
+            timeout=REQUEST_TIMEOUT,
+        )
+        if resp.status_code >= 400:
+            raise IndexerHTTPError(_error_message(resp))
+        return resp.json()
+
+
+class SessionAlgodClient(algodv2.AlgodClient):
+    """AlgodClient counterpart of SessionIndexerClient."""
+
+    def __init__(self, algod_token, algod_address, headers=None, session=None):
+        algodv2.AlgodClient.__init__(self, algod_token, algod_address, headers)
+        self.session = session if session is not None else requests.Session()
+
+    def algod_request(
+        self,
+        method,
+        requrl,
+        params=None,
+        data=None,
+        headers=None,
+        response_format="json",
+    ):
+        header = {"User-Agent": "py-algorand-sdk"}
+        if self.headers:
+            header.update(self.headers)
+        if headers:
+            header.update(headers)
+        if requrl not in constants.no_auth:
+            header[constants.algod_auth_header] = self.algod_token
+        if requrl not in constants.unversioned_paths:
+            requrl = algodv2.api_version_path_prefix + requrl
+
+        # wait-for-block long polls may outlast the usual timeout
+        resp = self.session.request(
+            method,
+            self.algod_address + requrl,
+            params=params,
+            data=data,
+            headers=header,
+            timeout=None if "/wait-for-block-after/" in requrl else REQUEST_TIMEOUT,
+        )
+        if resp.status_code >= 400:
+            raise AlgodHTTPError(_error_message(resp), resp.status_code)
+        if response_format == "json":
+            try:
+                return resp.json()
+            except ValueError as e:
+                raise AlgodResponseError(
+                    "Failed to parse JSON response from algod"
+                ) from e
+        return resp.content
+
+
+def indexer_rate_limiter(address):
+    """
+    Process wide rate limiter of an indexer endpoint.
+
+    :return: TokenBucket or None if the endpoint is not rate limited
+    """
+    rate = settings.ALGORAND_INDEXER_RATE_LIMITS.get(
+        str(address), settings.ALGORAND_INDEXER_RATE_LIMIT
+    )
+    if address is None or not rate:
+        return None
+    return get_bucket(str(address), rate)
+
+
+def get_algod(testnet=False, session=None):
+    """
+    :param session: requests Session or SessionPool to pool connections
+        with, the client opens a new connection per request without one
+    """
     header = {"X-Api-key": settings.ALGORAND_NODE_API_KEY}
 
     node_host = (
@@ -16,12 +158,21 @@ def get_algod(testnet=False):
         if testnet
         else settings.ALGORAND_NODE_HOST
     )
-    return algodv2.AlgodClient(
-        settings.ALGORAND_NODE_API_KEY, node_host, headers=header
-    )
+    if session is not None:
+        algod = SessionAlgodClient(
+            settings.ALGORAND_NODE_API_KEY, node_host, headers=header, session=session
+        )
+    else:
+        algod = algodv2.AlgodClient(
+            settings.ALGORAND_NODE_API_KEY, node_host, headers=header
+        )
+    if settings.ALGORAND_NODE_RATE_LIMIT:
+        bucket = get_bucket(str(node_host), settings.ALGORAND_NODE_RATE_LIMIT)
+        return RateLimitedClient(algod, bucket)
+    return algod
 
 
-def get_indexer(endpoint=None, key=None, testnet=False):
+def get_indexer(endpoint=None, key=None, testnet=False, session=None):
     if key is None:
         key = os.environ["ALGORAND_INDEXER_API_KEY"]
         header = {"X-Api-key": settings.ALGORAND_INDEXER_API_KEY}
@@ -35,37 +186,283 @@ def get_indexer(endpoint=None, key=None, testnet=False):
             else settings.ALGORAND_INDEXER_HOST
         )
 
+    if session is not None:
+        return SessionIndexerClient(
+            indexer_token=key, indexer_address=endpoint, headers=header, session=session
+        )
     return indexer.IndexerClient(
         indexer_token=key, indexer_address=endpoint, headers=header
     )
 
 
-class IndexerBase:
-    idxr = None
-    backup_idxr = None
-    use_fallback = False
-
-    def __init__(self, indexer=None, backup=None, testnet=False):
-        """Initialize the Index Parser"""
-        if indexer is None:
-            self.idxr = get_indexer(testnet=testnet)
-        else:
-            self.idxr = indexer
-
-        if backup is None:
-            ep = (
-                settings.TESTNET_ALGORAND_INDEXER_FALLBACK
-                if testnet
-                else settings.ALGORAND_INDEXER_FALLBACK
+DEFAULT_LATENCY = 0.25
+""" Latency assumed for an endpoint until it has served a request """
+
+ERROR_PENALTY = 10
+""" How strongly the error rate of an endpoint inflates its routing cost """
+
+RATE_LIMIT_PENALTY = 1.0
+""" Seconds an endpoint's rate limiter stays empty after 'Limit Exceeded' """
+
+
+CLIENT_ERROR_MARKERS = ("found", "invalid", "malformed", "unknown parameter")
+""" IndexerHTTPError messages caused by the request rather than the endpoint """
+
+
+def is_endpoint_fault(exc):
+    """Whether an exception raised by an indexer call counts against its endpoint"""
+    if isinstance(exc, IndexerHTTPError):
+        message = str(exc).lower()
+        return not any(marker in message for marker in CLIENT_ERROR_MARKERS)
+    return isinstance(exc, (URLError, OSError))
+
+
+class IndexerEndpoint:
+    """
+    Latency, error rate, circuit breaker and rate limiter state of one
+    indexer endpoint.
+    """
+
+    def __init__(self, client, bucket=None):
+        self.client = client
+        self.bucket = bucket
+        self.latency = None  # EWMA of successful request latency, seconds
+        self.error_rate = 0.0  # EWMA of endpoint faults per request
+        self.failures = 0  # consecutive endpoint faults
+        self.open_until = 0.0  # circuit breaker is open until this time
+
+    @property
+    def name(self):
+        return getattr(self.client, "indexer_address", repr(self.client))
+
+    @property
+    def is_open(self):
+        return time.monotonic() < self.open_until
+
+    @property
+    def cost(self):
+        latency = self.latency if self.latency is not None else DEFAULT_LATENCY
+        return max(latency, 0.001) * (1 + ERROR_PENALTY * self.error_rate)
+
+
+class IndexerPool:
+    """
+    Routes each indexer request to one of N endpoints.
+
+    Endpoints are picked at random, weighted by the inverse of their latency
+    EWMA inflated by their error rate, so traffic spreads across healthy
+    providers in proportion to how well they perform. After
+    ``failure_threshold`` consecutive faults an endpoint's circuit breaker
+    opens and it receives no traffic for ``cooldown`` seconds, after which a
+    single success closes it again. Endpoints with a configured rate limit
+    take a token from their shared TokenBucket before each request.
+
+    Any IndexerClient method may be called on the pool directly, e.g.
+    ``pool.block_info(round_num=1)``.
+    """
+
+    def __init__(self, clients, failure_threshold=3, cooldown=30, alpha=0.2):
+        if not clients:
+            raise ValueError("IndexerPool needs at least one indexer client")
+        self.endpoints = [
+            IndexerEndpoint(
+                client,
+                bucket=indexer_rate_limiter(getattr(client, "indexer_address", None)),
             )
-            self.backup_idxr = get_indexer(ep, "")
-        else:
-            self.backup_idxr = backup
+            for client in clients
+        ]
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name == "endpoints":
+            raise AttributeError(name)
+        attr = getattr(self.endpoints[0].client, name)
+        if not callable(attr):
+            return attr
+
+        def routed(*args, **kwargs):
+            return self.request(name, *args, **kwargs)
+
+        return routed
+
+    def choose(self):
+        """
+        :return: the IndexerEndpoint to use for the next request
+        """
+        with self._lock:
+            closed = [e for e in self.endpoints if not e.is_open]
+            if not closed:
+                # every breaker is open, probe the one closest to closing
+                return min(self.endpoints, key=lambda e: e.open_until)
+            weights = [1 / e.cost for e in closed]
+        return random.choices(closed, weights=weights)[0]
+
+    def request(self, method, *args, **kwargs):
+        endpoint = self.choose()
+        if endpoint.bucket is not None:
+            endpoint.bucket.acquire()
+
+        start = time.monotonic()
+        try:
+            result = getattr(endpoint.client, method)(*args, **kwargs)
+        except Exception as e:
+            if endpoint.bucket is not None and "limit exceeded" in str(e).lower():
+                endpoint.bucket.penalize(RATE_LIMIT_PENALTY)
+            if is_endpoint_fault(e):
+                self.record_failure(endpoint, exception=e)
+            else:
+                self.record_success(endpoint, time.monotonic() - start)
+            raise e
+
+        self.record_success(endpoint, time.monotonic() - start)
+        return result
+
+    def record_success(self, endpoint, elapsed):
+        with self._lock:
+            if endpoint.latency is None:
+                endpoint.latency = elapsed
+            else:
+                endpoint.latency += self.alpha * (elapsed - endpoint.latency)
+            endpoint.error_rate *= 1 - self.alpha
+            endpoint.failures = 0
+            endpoint.open_until = 0.0
+
+    def record_failure(self, endpoint, exception=None):
+        with self._lock:
+            endpoint.error_rate += self.alpha * (1 - endpoint.error_rate)
+            endpoint.failures += 1
+            if endpoint.failures >= self.failure_threshold:
+                endpoint.open_until = time.monotonic() + self.cooldown
+                LOGGER.warning(
+                    "Indexer circuit breaker open",
+                    endpoint=endpoint.name,
+                    exception=type(exception).__name__,
+                    cooldown=self.cooldown,
+                )
+
+
+def get_indexer_pool(indexer=None, backup=None, testnet=False, session=None):
+    """
+    Builds an IndexerPool over the primary indexer, its fallback, and any
+    extra ``ALGORAND_INDEXER_ENDPOINTS``.
+
+    :param session: requests Session or SessionPool shared by the clients
+        built here
+    """
+    if indexer is None:
+        indexer = get_indexer(testnet=testnet, session=session)
+
+    if backup is None:
+        ep = (
+            settings.TESTNET_ALGORAND_INDEXER_FALLBACK
+            if testnet
+            else settings.ALGORAND_INDEXER_FALLBACK
+        )
+        backup = get_indexer(ep, "", session=session)
+
+    extra = (
+        settings.TESTNET_ALGORAND_INDEXER_ENDPOINTS
+        if testnet
+        else settings.ALGORAND_INDEXER_ENDPOINTS
+    )
+    return IndexerPool(
+        [indexer, backup] + [get_indexer(ep, "", session=session) for ep in extra]
+    )
+
+
+class ClientContext:
+    """
+    Thread safe bundle of the Algorand clients of one network, shared by
+    parsers and accounts so bulk jobs neither rebuild clients per instance
+    nor open a connection per request.
+
+    Every client sends its requests through one SessionPool, a Session per
+    thread over a shared connection pool which keeps up to ``pool_maxsize``
+    keep-alive connections per host. Pool sizes default to the
+    ``HTTP_POOL_*`` settings. Clients are built lazily on first use.
+    """
+
+    def __init__(self, testnet=False, pool_connections=None, pool_maxsize=None):
+        self.testnet = testnet
+        self.session = SessionPool(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize
+        )
+        self._pool = None
+        self._algod = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def pool(self):
+        """IndexerPool over the network's indexer endpoints"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = get_indexer_pool(
+                    testnet=self.testnet, session=self.session
+                )
+            return self._pool
+
+    @property
+    def algod(self):
+        with self._lock:
+            if self._algod is None:
+                self._algod = get_algod(testnet=self.testnet, session=self.session)
+            return self._algod
+
+    def close(self):
+        self.session.close()
+
+
+_contexts = {}
+_contexts_lock = threading.Lock()
+
+
+def get_context(testnet=False):
+    """
+    Returns the process wide ClientContext of a network, creating it on
+    first use. Parsers and accounts built without explicit clients use it.
+    """
+    with _contexts_lock:
+        if testnet not in _contexts:
+            _contexts[testnet] = ClientContext(testnet=testnet)
+        return _contexts[testnet]
+
+
+class IndexerBase:
+    pool = None
+    context = None
+
+    def __init__(
+        self, indexer=None, backup=None, testnet=False, pool=None, context=None
+    ):
+        """
+        Initialize the Index Parser.
+
+        Requests are routed through an IndexerPool over the primary indexer,
+        its fallback, and any extra ``ALGORAND_INDEXER_ENDPOINTS``. A ready
+        made pool may be passed to share endpoint health between instances.
+        Without explicit clients the pool of ``context`` is used, by default
+        the process wide ClientContext of the network.
+        """
+        if pool is None:
+            if indexer is None and backup is None:
+                if context is None:
+                    context = get_context(testnet)
+                pool = context.pool
+            else:
+                pool = get_indexer_pool(indexer=indexer, backup=backup, testnet=testnet)
+        self.context = context
+        self.pool = pool
 
     @property
     def indexer(self):
-        """Swap indexer API keys"""
-        if self.use_fallback:
-            return self.backup_idxr
-        else:
-            return self.idxr
+        """Indexer pool routing each request to the healthiest endpoint"""
+        return self.pool
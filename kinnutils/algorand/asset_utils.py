@@ -2,18 +2,32 @@
 ASA metadata from indexer data.
 """
 import os
+import copy
 import json
-import requests
 import datetime
+import dataclasses
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
 
-from algosdk import error
+from algosdk import encoding, error
 
 from core.factory import AssetParserFactory
 from core.asset_utils_base import AssetParserBase
-from algorand.algoconn import IndexerBase
+from algorand.algoconn import IndexerBase, get_context
+from algorand.export import (
+    export_format,
+    read_jsonl,
+    spool_jsonl,
+    time_shards,
+    write_jsonl,
+    write_npz,
+)
+from algorand.holders import HolderSnapshot
+from algorand.metadata_cache import metadata_cache
 from algorand.schemas import ACfgTxn, AssetBaseSchema
 from decorators import retry
-from utils.ipfs import IPFSCacher, InvalidCIDError
+from utils.ipfs import IPFSCacher, InvalidCIDError, sniff_url
 from algorand.arc19 import cid_from_asset, address2cid
 
 from structlog import get_logger
@@ -22,6 +36,30 @@ from core.settings import settings
 IPFS_GATEWAY = settings.IPFS_GATEWAY
 LOGGER = get_logger()
 
+ACFG_PAGE_LIMIT = 1000
+""" Transactions requested per page of acfg history """
+
+ACFG_FIRST_PAGE_LIMIT = 100
+""" Transactions requested in the oldest page, enough for most histories """
+
+ACFG_WINDOW_ROUNDS = 100000
+""" Rounds in the first backwards window of long acfg histories """
+
+ARC69_NOTE_PREFIXES = (b'{"standard":"arc69"', b'{"standard": "arc69"')
+""" Note prefixes of ARC69 payloads which lead with the standard key """
+
+ARC69_PAGE_LIMIT = 10
+""" Transactions requested per page when looking for the latest ARC69 note """
+
+ARC69_WINDOW_ROUNDS = 10000
+""" Rounds in the first backwards window when looking for ARC69 notes """
+
+CACHED_FIELDS = ("_first_acfg_page", "_latest_acfg", "_acfg_txns", "_arc3", "_arc69")
+""" AssetParser attributes shared through the process wide metadata cache """
+
+BALANCES_PAGE_LIMIT = 1000
+""" Balances or transactions requested per page of holder and history reads """
+
 # def reserve_from_cid(cid):
 
 # decodedMultiHash, err := multihash.Decode(cidToEncode.Hash())
@@ -56,6 +94,8 @@ def make_asset_url(asa_url, ipfs_gateway=None):
 @AssetParserFactory.register("algo")
 class AssetParser(AssetParserBase, IndexerBase):
     _acfg_txns = None
+    _first_acfg_page = None
+    _latest_acfg = None
     _url = None
     _arc3 = None
     _arc69 = None
@@ -65,32 +105,290 @@ class AssetParser(AssetParserBase, IndexerBase):
     _is_destroyed = None
     _media_url = None
 
-    def __init__(self, asset_id=None, testnet=False):
+    def __init__(
+        self, asset_id=None, testnet=False, pool=None, cache=None, context=None
+    ):
+        """
+        :param cache: MetadataCache shared between parsers, defaults to the
+            process wide ``metadata_cache``, whose entries expire after
+            ``settings.ALGORAND_METADATA_CACHE_TTL`` seconds
+        :param context: ClientContext whose clients the parser uses
+        """
         self.asset_id = asset_id
         self.network = "algo"
-        IndexerBase.__init__(self, testnet=testnet)
+        self.testnet = testnet
+        self.cache = metadata_cache if cache is None else cache
+        if asset_id is not None:
+            for field, value in self.cache.get(asset_id, testnet=testnet).items():
+                setattr(self, field, value)
+        IndexerBase.__init__(self, testnet=testnet, pool=pool, context=context)
+
+    def _update_cache(self):
+        """
+        Shares the resolved fields of this parser through the metadata cache,
+        keyed by the round of the latest acfg transaction.
+        """
+        if self.asset_id is None:
+            return
+        if self._latest_acfg is None and self._acfg_txns:
+            self._latest_acfg = self._acfg_txns[0]
+        if self._latest_acfg is None:
+            return
+        fields = {
+            field: getattr(self, field)
+            for field in CACHED_FIELDS
+            if getattr(self, field) is not None
+        }
+        self.cache.put(
+            self.asset_id,
+            self._latest_acfg.params.round,
+            fields,
+            testnet=self.testnet,
+        )
+
+    @classmethod
+    def parse_many(
+        cls,
+        asset_ids,
+        concurrency=16,
+        ipfs_concurrency=None,
+        testnet=False,
+        pool=None,
+        context=None,
+    ):
+        """
+        Resolves the metadata of many assets concurrently and yields their
+        ``to_pydantic()`` results as they complete.
+
+        Each asset passes through two pipelined stages. The indexer stage
+        looks up the acfg transactions, resolves the (ARC19) asset url and
+        decodes the ARC69 note; the IPFS stage fetches the ARC3 JSON and
+        builds the result. Stages run on separate worker pools, so indexer
+        lookups for later assets overlap with gateway fetches for earlier
+        ones, and every parser shares one IndexerPool. Assets which fail are
+        logged and skipped.
+
+        :param asset_ids: iterable of asset ids
+        :param concurrency: workers in the indexer stage
+        :param ipfs_concurrency: workers in the IPFS stage, defaults to
+            ``concurrency``
+        :param pool: IndexerPool shared by every parser, defaults to the
+            pool of ``context``
+        :param context: ClientContext shared by every parser, defaults to
+            the process wide context of the network
+        :returns: generator of AssetBaseSchema, in completion order
+        """
+        if pool is None:
+            pool = (context or get_context(testnet)).pool
+
+        def indexer_stage(asset_id):
+            parser = cls(asset_id, testnet=testnet, pool=pool)
+            parser.url
+            parser.arc69
+            return parser
+
+        def ipfs_stage(parser):
+            parser.arc3
+            return parser.to_pydantic()
+
+        asset_ids = iter(asset_ids)
+        indexer_workers = ThreadPoolExecutor(max_workers=concurrency)
+        ipfs_workers = ThreadPoolExecutor(max_workers=ipfs_concurrency or concurrency)
+        pending = {}  # future -> (stage, asset_id)
+
+        def feed(count):
+            for asset_id in islice(asset_ids, count):
+                future = indexer_workers.submit(indexer_stage, asset_id)
+                pending[future] = ("indexer", asset_id)
+
+        try:
+            feed(2 * concurrency)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, asset_id = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        LOGGER.error(
+                            "Failed to parse asset",
+                            asset_id=asset_id,
+                            stage=stage,
+                            exception=type(e).__name__,
+                        )
+                        feed(1)
+                        continue
+
+                    if stage == "indexer":
+                        future = ipfs_workers.submit(ipfs_stage, result)
+                        pending[future] = ("ipfs", asset_id)
+                    else:
+                        feed(1)
+                        yield result
+        finally:
+            indexer_workers.shutdown(wait=False, cancel_futures=True)
+            ipfs_workers.shutdown(wait=False, cancel_futures=True)
 
     @property
     def acfg_txns(self):
+        """
+        Full acfg history of the asset, newest first. Prefer
+        ``iter_acfg_txns`` when only the most recent transactions are needed.
+        """
         if self._acfg_txns is None:
-            self._acfg_txns = self._get_acfg_txns()
+            self._acfg_txns = list(self.iter_acfg_txns())
+            self._update_cache()
         return self._acfg_txns
 
-    @retry(error.IndexerHTTPError, tries=10, delay=0.5, logger=LOGGER)
-    def _get_acfg_txns(self):
-        # FIXME: This search asset txns could be wrong if theres over 1k of them
-        try:
-            responses = self.indexer.search_asset_transactions(
-                asset_id=self.asset_id, txn_type="acfg"
+    @property
+    def latest_acfg_txn(self):
+        if self._latest_acfg is None:
+            self._latest_acfg = next(self.iter_acfg_txns())
+            self._update_cache()
+        return self._latest_acfg
+
+    @property
+    def creation_acfg_txn(self):
+        if self._acfg_txns is not None:
+            return self._acfg_txns[-1]
+        return self._get_first_acfg_page()[0][0]
+
+    def iter_acfg_txns(
+        self,
+        note_prefix=None,
+        first_limit=ACFG_FIRST_PAGE_LIMIT,
+        window=ACFG_WINDOW_ROUNDS,
+        page_limit=None,
+        min_round=None,
+    ):
+        """
+        Lazily iterates over the acfg history of the asset, newest first.
+
+        A small oldest page is read first, as it holds the creation
+        transaction. If it has no ``next-token`` the whole history fits in
+        it and it is served reversed. Otherwise the remaining history is read
+        backwards from the current round, in windows of rounds which grow as
+        they go, so callers which stop early only read the most recent pages.
+
+        With ``page_limit`` each window is read as a single page of at most
+        that many transactions and served as soon as it arrives. A window
+        holding more is narrowed to its newer half and read again, so callers
+        which stop early never download a whole busy window.
+
+        :param note_prefix: only include transactions whose note starts
+            with these bytes
+        :param first_limit: transactions requested in the oldest page
+        :param window: rounds covered by the first backwards window
+        :param page_limit: transactions requested per window page, None to
+            read each window whole in pages of ``ACFG_PAGE_LIMIT``
+        :param min_round: only include transactions from this round on, only
+            supported with ``note_prefix``
+        :returns: generator of ACfgTxn
+        """
+        if note_prefix is None:
+            if self._acfg_txns is not None:
+                yield from self._acfg_txns
+                return
+            first_txns, next_token = self._get_first_acfg_page()
+        else:
+            response = self._get_acfg_page(
+                min_round=min_round, note_prefix=note_prefix, limit=first_limit
+            )
+            first_txns = self._parse_acfg_txns(response["transactions"])
+            next_token = response.get("next-token")
+
+        if not next_token or not first_txns:
+            yield from reversed(first_txns)
+            return
+
+        # the window reads include every txn of the last round on the first page
+        boundary = first_txns[-1].params.round
+        max_round = self._current_round()
+        while max_round >= boundary:
+            min_round = max(boundary, max_round - window + 1)
+            txns = self._read_acfg_window(min_round, max_round, note_prefix, page_limit)
+            if txns is None:  # too busy to serve in one page, read the newer half
+                window = (max_round - min_round + 2) // 2
+                continue
+
+            yield from reversed(txns)
+            max_round = min_round - 1
+            window *= 4
+
+        yield from reversed([t for t in first_txns if t.params.round < boundary])
+
+    def _read_acfg_window(self, min_round, max_round, note_prefix, page_limit):
+        """
+        :returns: list of the acfg txns of the window, oldest first, or None
+            when ``page_limit`` is set and the window spans several rounds
+            with more transactions than fit in one page
+        """
+        txns = []
+        next_page = None
+        while True:
+            response = self._get_acfg_page(
+                min_round=min_round,
+                max_round=max_round,
+                next_page=next_page,
+                note_prefix=note_prefix,
+                limit=page_limit or ACFG_PAGE_LIMIT,
             )
-            self.use_fallback = False
+            page = response["transactions"]
+            if (
+                page_limit
+                and next_page is None
+                and min_round < max_round
+                and len(page) >= page_limit
+            ):
+                return None
+            txns.extend(self._parse_acfg_txns(page))
+            next_page = response.get("next-token")
+            if not next_page or not page:
+                return txns
 
-        except error.IndexerHTTPError as e:
-            self.use_fallback = True
-            raise e
+    def _get_first_acfg_page(self):
+        """
+        :returns: tuple of the oldest acfg txns, oldest first, and the
+            ``next-token`` of their page
+        """
+        if self._first_acfg_page is None:
+            response = self._get_acfg_page(limit=ACFG_FIRST_PAGE_LIMIT)
+            self._first_acfg_page = (
+                self._parse_acfg_txns(response["transactions"]),
+                response.get("next-token"),
+            )
+        return self._first_acfg_page
+
+    @retry(error.IndexerHTTPError, tries=10, delay=0.5, logger=LOGGER)
+    def _get_acfg_page(
+        self,
+        min_round=None,
+        max_round=None,
+        next_page=None,
+        note_prefix=None,
+        limit=ACFG_PAGE_LIMIT,
+    ):
+        return self.indexer.search_asset_transactions(
+            asset_id=self.asset_id,
+            txn_type="acfg",
+            min_round=min_round,
+            max_round=max_round,
+            next_page=next_page,
+            note_prefix=note_prefix,
+            limit=limit,
+        )
+
+    @retry(error.IndexerHTTPError, tries=10, delay=0.5, logger=LOGGER)
+    def _current_round(self):
+        return self.indexer.health()["round"]
 
+    def _parse_acfg_txns(self, transactions):
+        """
+        Parses a page of indexer transactions into ACfgTxns, oldest first,
+        including acfg inner transactions of application calls.
+        """
         txns = []
-        for txn in responses["transactions"]:
+        for txn in transactions:
             if txn.get("asset-config-transaction", None):
                 txns.append(ACfgTxn(txn))
             elif txn.get("application-transaction", None):
@@ -115,13 +413,12 @@ class AssetParser(AssetParserBase, IndexerBase):
                         txns.append(ACfgTxn(inner))
                         continue
 
-        txns.reverse()  # puts the most recent txn first
         return txns
 
     @property
     def url(self):
         if self._url is None:
-            self._url = self.get_asset_url(self.asset_data.url)
+            self._url = self.get_asset_url(self.asset_data.params.url)
 
         return self._url
 
@@ -129,12 +426,14 @@ class AssetParser(AssetParserBase, IndexerBase):
     def arc3(self):
         if self._arc3 is None:
             self._arc3 = self._get_arc3()
+            self._update_cache()
         return self._arc3 or {}
 
     @property
     def arc69(self):
         if self._arc69 is None:
             self._arc69 = self._get_arc69()
+            self._update_cache()
         return self._arc69 or {}
 
     # @property
@@ -155,9 +454,10 @@ class AssetParser(AssetParserBase, IndexerBase):
 
     def _get_arc3(self):
         """Parses the metadata request of ipfs metadata"""
+        name = self.asset_data.params.name or ""
         if not self.url:
             return False
-        elif self.asset_data.name[-5:] == "@arc3" or self.url[-5:] == "#arc3":
+        elif name[-5:] == "@arc3" or self.url[-5:] == "#arc3":
             try:
                 ipfs = IPFSCacher(self.url)
                 content = ipfs.fetch_content()
@@ -168,24 +468,81 @@ class AssetParser(AssetParserBase, IndexerBase):
                 return False
         else:
             ipfs = IPFSCacher(self.url)
-            # prefetch
-            req = requests.head(ipfs.url)
-            if "Content-Type" in req.headers:
-                content_type = req.headers["Content-Type"]
-            elif "Location" in req.headers:
-                req = requests.head(req.headers["Location"])
-                content_type = req.headers["Content-Type"]
-            else:  # can't parse headers, TODO: might be more cases
-                raise NotImplementedError()
-
-            if "json" in content_type:
-                content = ipfs.fetch_content()
-                return json.loads(content.decode())
-            else:
+            # one streamed request tells metadata from media, and only keeps
+            # the body of small json metadata
+            sniffed = ipfs.sniff_content()
+            if not sniffed.is_json:
                 return False
+            content = sniffed.content
+            if content is None:  # oversized metadata
+                content = ipfs.fetch_content()
+            return json.loads(content.decode())
 
     def _get_arc69(self):
-        for txn in self.acfg_txns:
+        """
+        Finds the newest ARC69 metadata of the asset.
+
+        When the acfg history is already known, or fits in its oldest page,
+        it is scanned locally. Otherwise the indexer is asked only for recent
+        acfg transactions whose note starts with the ARC69 standard key, a
+        few at a time, stopping at the first valid payload. The acfg
+        transactions after that payload are then scanned as well, as a newer
+        note may carry ARC69 metadata with its keys in another order. Only if
+        no note matches a prefix is the full history scanned.
+        """
+        if self._acfg_txns is None:
+            _, next_token = self._get_first_acfg_page()
+            if next_token:
+                return self._get_latest_arc69() or self._scan_arc69(
+                    self.iter_acfg_txns()
+                )
+        return self._scan_arc69(self.iter_acfg_txns())
+
+    def _get_latest_arc69(self):
+        latest = None
+        for prefix in ARC69_NOTE_PREFIXES:
+            # later prefixes only need to beat the payload already found
+            min_round = latest[0].params.round + 1 if latest else None
+            for txn in self.iter_acfg_txns(
+                note_prefix=prefix,
+                first_limit=ARC69_PAGE_LIMIT,
+                window=ARC69_WINDOW_ROUNDS,
+                page_limit=ARC69_PAGE_LIMIT,
+                min_round=min_round,
+            ):
+                notedata = self._scan_arc69([txn])
+                if notedata:
+                    latest = (txn, notedata)
+                    break
+        if latest is None:
+            return False
+        txn, notedata = latest
+        return self._scan_arc69(self._acfg_txns_after(txn), default=notedata)
+
+    def _acfg_txns_after(self, txn):
+        """
+        :returns: list of the acfg txns confirmed after ``txn``, newest first
+        """
+        txns = []
+        next_page = None
+        while True:
+            response = self._get_acfg_page(
+                min_round=txn.params.round, next_page=next_page
+            )
+            txns.extend(self._parse_acfg_txns(response["transactions"]))
+            next_page = response.get("next-token")
+            if not next_page or not response["transactions"]:
+                break
+
+        ids = [t.txn_id for t in txns]
+        if txn.txn_id in ids:
+            txns = txns[ids.index(txn.txn_id) + 1 :]
+        else:
+            txns = [t for t in txns if t.params.round > txn.params.round]
+        return list(reversed(txns))
+
+    def _scan_arc69(self, txns, default=False):
+        for txn in txns:
             if txn.note:
                 try:
                     notedata = json.loads(txn.note.decode("utf-8", "ignore"))
@@ -196,7 +553,7 @@ class AssetParser(AssetParserBase, IndexerBase):
                 except json.JSONDecodeError:
                     pass
         else:
-            return False
+            return default
 
     def get_asset_url(self, url):
         """Helper function that attempts to check and parse arc19 from the
@@ -227,12 +584,8 @@ class AssetParser(AssetParserBase, IndexerBase):
                 and "tinyurl" not in self.url
                 and "ipfs" not in self.url
             ):
-                req = requests.head(self.url)
-                mime = req.headers.get("Content-Type")
-                if "image" in mime or "animation" in mime:
-                    return True
-
-                return False
+                sniffed = sniff_url(self.url, max_json_bytes=0)
+                return sniffed.is_media
         return True
 
     @property
@@ -285,16 +638,20 @@ class AssetParser(AssetParserBase, IndexerBase):
     @property
     def asset_data(self):
         if self._data is None:
-            data = self.acfg_txns[-1]  # Start with the OG data from creation
-            if len(self.acfg_txns) > 1:
-                data.params.manager = self.acfg_txns[0].params.manager
-                data.params.reserve = self.acfg_txns[0].params.reserve
-                data.params.freeze = self.acfg_txns[0].params.freeze
-                data.params.clawback = self.acfg_txns[0].params.clawback
-            if len(self.acfg_txns) > 3:
-                # TODO: We need examples of assets in this case to make sure
-                ## Final data is recorded correctly
-                pass
+            data = self.creation_acfg_txn  # Start with the OG data from creation
+            latest = self.latest_acfg_txn
+            if latest is not data:
+                # cached txns are shared between parsers, never mutate them
+                data = copy.copy(data)
+                data.params = dataclasses.replace(
+                    data.params,
+                    manager=latest.params.manager,
+                    reserve=latest.params.reserve,
+                    freeze=latest.params.freeze,
+                    clawback=latest.params.clawback,
+                )
+            # TODO: We need examples of heavily reconfigured assets to make sure
+            ## Final data is recorded correctly
             self._data = data
 
         return self._data
@@ -302,11 +659,12 @@ class AssetParser(AssetParserBase, IndexerBase):
     @property
     def is_destroyed(self):
         if self._is_destroyed is None:
+            latest = self.latest_acfg_txn
             if (
-                self.acfg_txns[0].params.manager
-                == self.acfg_txns[0].params.clawback
-                == self.acfg_txns[0].params.freeze
-                == self.acfg_txns[0].params.clawback
+                latest.params.manager
+                == latest.params.clawback
+                == latest.params.freeze
+                == latest.params.clawback
                 is None
             ):
                 self._is_destroyed = True
@@ -372,20 +730,122 @@ class AssetParser(AssetParserBase, IndexerBase):
             raise e
         return holders
 
-    @retry(error.IndexerHTTPError, tries=10, delay=0.5, logger=LOGGER)
     def get_all_asset_balances(self):
-        holders = []
-        asset_balances_next_page = None
+        return list(self.iter_asset_balances())
+
+    def iter_asset_balance_pages(
+        self, min_balance=None, max_balance=None, include_all=False
+    ):
+        """
+        Streams the pages of the holders of the asset. Each page is retried
+        on its own, so a failure late in a long listing does not restart it.
+
+        :returns: generator of indexer ``asset_balances`` responses
+        """
+        next_page = None
         while True:
-            asset_balances = self.indexer.asset_balances(
-                asset_id=self.asset_id, limit=1000, next_page=asset_balances_next_page
+            page = self.get_asset_balances(
+                limit=BALANCES_PAGE_LIMIT,
+                next_page=next_page,
+                min_balance=min_balance,
+                max_balance=max_balance,
+                include_all=include_all,
             )
-            holders.extend(asset_balances.get("balances"))
-            asset_balances_next_page = asset_balances.get("next-token", None)
+            yield page
+            next_page = page.get("next-token")
+            if not next_page or not page.get("balances"):
+                break
+
+    def iter_asset_balances(
+        self, min_balance=None, max_balance=None, include_all=False
+    ):
+        """
+        Streams the holders of the asset one page at a time, so memory use
+        does not grow with the number of holders.
+
+        :returns: generator of indexer balance dicts
+        """
+        for page in self.iter_asset_balance_pages(
+            min_balance, max_balance, include_all
+        ):
+            yield from page.get("balances", [])
+
+    def holder_snapshot(self):
+        """
+        Streams the holders of the asset into a compact HolderSnapshot.
+
+        The pages of a long listing are read at successive rounds, so a
+        transfer landing during the listing may be seen by one of its
+        accounts and not the other. Once listed, every account is brought
+        forward to the round of the last page with the transfers confirmed
+        after its own page was read, so each transfer counts exactly once.
+
+        :return: HolderSnapshot at the round of the last page
+        """
+        rounds = []
+        pages = []  # (first decoded address, round) of the non-empty pages
+
+        def balances():
+            for page in self.iter_asset_balance_pages():
+                rounds.append(page["current-round"])
+                if page.get("balances"):
+                    key = encoding.decode_address(page["balances"][0]["address"])
+                    pages.append((key, page["current-round"]))
+                yield from page.get("balances", [])
+
+        listed = HolderSnapshot.from_balances(self.asset_id, None, balances())
+        # endpoints of the pool may differ slightly in how far they have read
+        first_round, last_round = min(rounds), max(rounds)
+        snapshot = HolderSnapshot(
+            self.asset_id, first_round, listed.addresses, listed.amounts
+        )
+        if last_round == first_round:
+            return snapshot
+        return snapshot.apply_transfers(
+            self.iter_axfer_txns(first_round + 1, last_round), last_round, pages=pages
+        )
+
+    def update_holder_snapshot(self, snapshot):
+        """
+        Brings a HolderSnapshot of the asset up to the current round by
+        applying only the asset transfers confirmed since its round, instead
+        of listing every holder again.
 
-            if asset_balances_next_page is None:
+        :return: HolderSnapshot at the indexer's current round
+        """
+        max_round = self._current_round()
+        if max_round <= snapshot.round:
+            return snapshot
+        return snapshot.apply_transfers(
+            self.iter_axfer_txns(snapshot.round + 1, max_round), max_round
+        )
+
+    def iter_axfer_txns(self, min_round=None, max_round=None):
+        """
+        Streams the asset transfer transactions of the asset, oldest first.
+        Application calls whose inner transactions transfer the asset are
+        returned as their root transaction.
+
+        :returns: generator of indexer transaction dicts
+        """
+        next_page = None
+        while True:
+            response = self._get_axfer_page(min_round, max_round, next_page)
+            yield from response["transactions"]
+            next_page = response.get("next-token")
+            if not next_page or not response["transactions"]:
                 break
-        return holders
+
+    @retry(error.IndexerHTTPError, tries=10, delay=0.5, logger=LOGGER)
+    def _get_axfer_page(self, min_round=None, max_round=None, next_page=None):
+        return self.indexer.search_asset_transactions(
+            asset_id=self.asset_id,
+            txn_type="axfer",
+            min_round=min_round,
+            max_round=max_round,
+            next_page=next_page,
+            limit=BALANCES_PAGE_LIMIT,
+        )
 
     @retry(error.IndexerHTTPError, tries=10, delay=0.5, logger=LOGGER)
     def get_asset_transactions(
@@ -404,6 +864,113 @@ class AssetParser(AssetParserBase, IndexerBase):
             raise e
         return transactions["transactions"]
 
+    def iter_transactions_sharded(
+        self, start_time, end_time, shards=16, workers=8, txn_type=None
+    ):
+        """
+        Streams the transactions of the asset confirmed in
+        ``[start_time, end_time)``, oldest first.
+
+        The range is split into ``shards`` time shards which are paginated
+        concurrently by ``workers`` threads, a bounded window ahead of the
+        shard being yielded. Shards are spooled to temporary files as their
+        pages arrive and streamed back in order, so memory use does not grow
+        with the size of the export. Each shard is queried with a second of
+        margin on both sides and filtered to its own half open range by round
+        time, so transactions on shard boundaries are neither lost nor
+        repeated, and concatenating the shards keeps round order.
+
+        :param start_time: datetime, unix timestamp or RFC3339 string
+        :param end_time: datetime, unix timestamp or RFC3339 string
+        :param txn_type: only include transactions of this type
+        :returns: generator of indexer transaction dicts
+        """
+        shards = iter(time_shards(start_time, end_time, shards))
+        pool = ThreadPoolExecutor(max_workers=workers)
+
+        def submit(shard):
+            return pool.submit(self._get_time_shard, *shard, txn_type)
+
+        try:
+            pending = deque(submit(shard) for shard in islice(shards, 2 * workers))
+            while pending:
+                future = pending.popleft()
+                for shard in islice(shards, 1):
+                    pending.append(submit(shard))
+                yield from read_jsonl(future.result())
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            for future in pending:
+                if future.done() and future.exception() is None:
+                    future.result().close()
+
+    def _get_time_shard(self, shard_start, shard_end, txn_type=None):
+        """
+        :return: temporary file of the transactions with a round time in
+            ``[shard_start, shard_end)``, oldest first, see ``spool_jsonl``
+        """
+        after = datetime.datetime.fromtimestamp(
+            shard_start - 1, tz=datetime.timezone.utc
+        )
+        before = datetime.datetime.fromtimestamp(
+            shard_end + 1, tz=datetime.timezone.utc
+        )
+
+        def txns():
+            next_page = None
+            while True:
+                response = self._get_time_page(
+                    after.isoformat(), before.isoformat(), next_page, txn_type
+                )
+                yield from (
+                    txn
+                    for txn in response["transactions"]
+                    if shard_start <= txn["round-time"] < shard_end
+                )
+                next_page = response.get("next-token")
+                if not next_page or not response["transactions"]:
+                    break
+
+        return spool_jsonl(txns())
+
+    @retry(error.IndexerHTTPError, tries=10, delay=0.5, logger=LOGGER)
+    def _get_time_page(self, start_time, end_time, next_page=None, txn_type=None):
+        return self.indexer.search_asset_transactions(
+            asset_id=self.asset_id,
+            txn_type=txn_type,
+            start_time=start_time,
+            end_time=end_time,
+            next_page=next_page,
+            limit=BALANCES_PAGE_LIMIT,
+        )
+
+    def export_transactions(
+        self,
+        path,
+        start_time,
+        end_time,
+        format=None,
+        shards=16,
+        workers=8,
+        txn_type=None,
+    ):
+        """
+        Exports the transactions of the asset confirmed in
+        ``[start_time, end_time)`` to ``path``, in round order, see
+        ``iter_transactions_sharded``.
+
+        :param format: ``jsonl`` or the columnar ``npz``, by default taken
+            from the extension of ``path``
+        :return: number of transactions exported
+        """
+        write = write_npz if export_format(path, format) == "npz" else write_jsonl
+        return write(
+            self.iter_transactions_sharded(
+                start_time, end_time, shards=shards, workers=workers, txn_type=txn_type
+            ),
+            path,
+        )
+
     def to_pydantic(self, media_info=None, collections=[]):
         # only including arc3 description, even though it's already in metadata
         descr = None
@@ -414,7 +981,7 @@ class AssetParser(AssetParserBase, IndexerBase):
         asset_info = self.asset_data.params.__dict__
         asset_pydantic = AssetBaseSchema(
             asset_id=self.asset_id,
-            name=self.asset_data.name,
+            name=self.asset_data.params.name or "",
             description=descr,
             asset_info=asset_info,  # creator, reserve, clawback, freeze, manager
             asset_metadata=self.all_metadata,
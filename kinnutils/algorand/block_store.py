@@ -0,0 +1,80 @@
+"""This module provides a persistent, local store of finalized blocks so that
+historical rounds can be replayed without going back to the indexer.
+"""
+import json
+import zlib
+import sqlite3
+import threading
+
+
+class BlockStore:
+    """
+    SQLite backed store of indexer block responses, keyed by round and
+    compressed with zlib. A single store may be shared between threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blocks "
+            "(round INTEGER PRIMARY KEY, data BLOB NOT NULL)"
+        )
+
+    @staticmethod
+    def _encode(block):
+        return zlib.compress(json.dumps(block, separators=(",", ":")).encode())
+
+    @staticmethod
+    def _decode(data):
+        return json.loads(zlib.decompress(data))
+
+    def __contains__(self, round_num):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM blocks WHERE round = ?", (round_num,)
+            ).fetchone()
+        return row is not None
+
+    def get(self, round_num):
+        """
+        :return: the stored block, or None if the round is not stored
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM blocks WHERE round = ?", (round_num,)
+            ).fetchone()
+        return self._decode(row[0]) if row else None
+
+    def get_range(self, start, end):
+        """
+        Bulk read of the stored blocks in ``[start, end)``.
+
+        :return: dict --> {round: block}, missing rounds are left out
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT round, data FROM blocks WHERE round >= ? AND round < ?",
+                (start, end),
+            ).fetchall()
+        return {round_num: self._decode(data) for round_num, data in rows}
+
+    def put(self, round_num, block):
+        self.put_many([(round_num, block)])
+
+    def put_many(self, blocks):
+        """Stores an iterable of (round, block) pairs in one transaction."""
+        rows = [(round_num, self._encode(block)) for round_num, block in blocks]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO blocks (round, data) VALUES (?, ?)",
+                    rows,
+                )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,143 @@
+"""This module provides writers for streams of indexer transactions, as JSON
+lines or as a columnar NumPy file, and the time sharding used to export them
+concurrently.
+"""
+import json
+import math
+import datetime
+import tempfile
+from array import array
+
+import numpy as np
+from algosdk import encoding
+
+EXPORT_FORMATS = ("jsonl", "npz")
+""" Supported transaction export formats """
+
+ZERO_KEY = bytes(32)
+""" Decoded address written for transactions without a receiver """
+
+
+def to_datetime(value):
+    """
+    :param value: datetime, unix timestamp or RFC3339 string
+    :return: timezone aware datetime, naive values are taken as UTC
+    """
+    if isinstance(value, (int, float)):
+        return datetime.datetime.fromtimestamp(value, tz=datetime.timezone.utc)
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def time_shards(start_time, end_time, shards):
+    """
+    Splits ``[start_time, end_time)`` into at most ``shards`` contiguous
+    ranges of equal duration, aligned to whole seconds like block times.
+
+    :return: list of (start, end) unix timestamp tuples, in time order
+    """
+    start = math.ceil(to_datetime(start_time).timestamp())
+    end = math.ceil(to_datetime(end_time).timestamp())
+    if end <= start:
+        return []
+    step = max(1, math.ceil((end - start) / max(shards, 1)))
+    return [(s, min(s + step, end)) for s in range(start, end, step)]
+
+
+def export_format(path, format=None):
+    if format is None:
+        format = "npz" if str(path).endswith(".npz") else "jsonl"
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format {format}")
+    return format
+
+
+def write_jsonl(txns, path):
+    """
+    Writes transactions to ``path``, one json document per line.
+
+    :return: number of transactions written
+    """
+    count = 0
+    with open(path, "w") as f:
+        for txn in txns:
+            f.write(json.dumps(txn, separators=(",", ":")))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def spool_jsonl(txns):
+    """
+    Writes transactions to an anonymous temporary file as json lines, so
+    results fetched ahead of the ones being consumed wait on disk instead
+    of in memory.
+
+    :return: the temporary file, rewound, see ``read_jsonl``
+    """
+    f = tempfile.TemporaryFile("w+")
+    try:
+        for txn in txns:
+            f.write(json.dumps(txn, separators=(",", ":")))
+            f.write("\n")
+        f.seek(0)
+    except BaseException:
+        f.close()
+        raise
+    return f
+
+
+def read_jsonl(f):
+    """
+    Streams the transactions of a file written by ``spool_jsonl``, closing
+    it once read.
+
+    :returns: generator of transaction dicts
+    """
+    with f:
+        for line in f:
+            yield json.loads(line)
+
+
+def write_npz(txns, path):
+    """
+    Writes the main fields of transactions to ``path`` as columns of a
+    ``.npz`` file: ``id``, ``round``, ``round_time``, ``tx_type``, ``sender``,
+    ``receiver`` and ``amount``. Addresses are ``(N, 32)`` uint8 arrays of
+    decoded keys, zero where a transaction has no receiver. Receivers and
+    amounts are those of asset or payment transfers.
+
+    :return: number of transactions written
+    """
+    ids, tx_types = [], []
+    rounds, round_times, amounts = array("Q"), array("q"), array("Q")
+    senders, receivers = bytearray(), bytearray()
+    for txn in txns:
+        transfer = (
+            txn.get("asset-transfer-transaction")
+            or txn.get("payment-transaction")
+            or {}
+        )
+        ids.append(txn["id"])
+        tx_types.append(txn["tx-type"])
+        rounds.append(txn["confirmed-round"])
+        round_times.append(txn["round-time"])
+        amounts.append(transfer.get("amount", 0))
+        senders += encoding.decode_address(txn["sender"])
+        receiver = transfer.get("receiver")
+        receivers += encoding.decode_address(receiver) if receiver else ZERO_KEY
+
+    np.savez(
+        path,
+        id=np.array(ids, dtype="S"),
+        round=np.array(rounds, dtype=np.uint64),
+        round_time=np.array(round_times, dtype=np.int64),
+        tx_type=np.array(tx_types, dtype="S"),
+        sender=np.frombuffer(bytes(senders), dtype=np.uint8).reshape(-1, 32),
+        receiver=np.frombuffer(bytes(receivers), dtype=np.uint8).reshape(-1, 32),
+        amount=np.array(amounts, dtype=np.uint64),
+    )
+    return len(ids)
@@ -0,0 +1,187 @@
+"""This module provides a generator based follower that tails the chain and
+yields asset events as new blocks land.
+"""
+import os
+import time
+import structlog
+
+from algosdk.error import AlgodHTTPError
+
+from decorators import retry
+
+LOGGER = structlog.get_logger()
+
+
+class Checkpoint:
+    """
+    Last processed round persisted to a local file, so a follower can resume
+    after a restart without re-scanning.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """
+        Reads the last processed round from the checkpoint file.
+
+        :return: int or None if no checkpoint has been written yet
+        """
+        try:
+            with open(self.path, "r") as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, round_num):
+        """Atomically replaces the checkpoint file with ``round_num``."""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(f"{round_num}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class BlockFollower:
+    """
+    Tails the chain through an IndexParser and yields asset creation,
+    modification and deletion events as they arrive.
+
+    When the follower falls behind the tip it reads ahead ``read_ahead``
+    rounds concurrently with ``IndexParser.parse_blocks``. Once caught up it
+    waits ``poll_interval`` seconds between checks for a new round.
+
+    Rounds with events are checkpointed as soon as they are processed, empty
+    rounds at most every ``checkpoint_interval`` seconds and at the tip.
+    """
+
+    def __init__(
+        self,
+        parser,
+        checkpoint_path=None,
+        start_round=None,
+        read_ahead=4,
+        poll_interval=2.0,
+        checkpoint_interval=5.0,
+    ):
+        self.parser = parser
+        self.checkpoint = Checkpoint(checkpoint_path) if checkpoint_path else None
+        self.start_round = start_round
+        self.read_ahead = read_ahead
+        self.poll_interval = poll_interval
+        self.checkpoint_interval = checkpoint_interval
+        self._saved_at = None
+
+    def __iter__(self):
+        return self.follow()
+
+    def _first_round(self):
+        if self.checkpoint is not None:
+            last_round = self.checkpoint.load()
+            if last_round is not None:
+                return last_round + 1
+        if self.start_round is not None:
+            return self.start_round
+        return self.current_round()
+
+    def current_round(self):
+        return self.parser.current_round()
+
+    def _save(self, round_num):
+        if self.checkpoint is not None:
+            self.checkpoint.save(round_num)
+            self._saved_at = time.monotonic()
+
+    def _save_due(self):
+        return (
+            self._saved_at is None
+            or time.monotonic() - self._saved_at >= self.checkpoint_interval
+        )
+
+    def wait_for_round(self, round_num):
+        """
+        Blocks until ``round_num`` is available.
+
+        :return: the latest available round
+        """
+        while True:
+            tip = self.current_round()
+            if tip >= round_num:
+                return tip
+            time.sleep(self.poll_interval)
+
+    def follow(self):
+        """
+        Generator which yields event dicts, ``{"id", "event", "round"}``, in
+        round order. The checkpoint is advanced once every event of a round
+        has been yielded, so a restart repeats at most one round with events,
+        plus the empty rounds after it from the last ``checkpoint_interval``
+        seconds.
+        """
+        next_round = self._first_round()
+        LOGGER.info("Following chain", round=next_round)
+
+        while True:
+            tip = self.wait_for_round(next_round)
+            for round_num, events in self.parser.parse_blocks(
+                next_round, tip + 1, workers=self.read_ahead
+            ):
+                if events is None:
+                    # retry the failed round after a short pause
+                    time.sleep(self.poll_interval)
+                    break
+
+                for event in events:
+                    yield dict(event, round=round_num)
+                if events or round_num == tip or self._save_due():
+                    self._save(round_num)
+                next_round = round_num + 1
+
+
+class AlgodBlockFollower(BlockFollower):
+    """
+    BlockFollower which waits for new rounds with algod's wait-for-block long
+    poll instead of polling the indexer ``/health`` endpoint. The request
+    returns as soon as the next round lands, and the round is then handed to
+    the usual IndexParser block parsing path.
+
+    Blocks are still read from the indexer, which usually lags algod by a
+    second or two, so once algod has a round the follower waits for the
+    indexer to catch up, checking every ``indexer_poll_interval`` seconds,
+    rather than failing the round and retrying it ``poll_interval`` later.
+    """
+
+    def __init__(self, parser, algod, indexer_poll_interval=0.25, **kwargs):
+        BlockFollower.__init__(self, parser, **kwargs)
+        self.algod = algod
+        self.indexer_poll_interval = indexer_poll_interval
+
+    @retry(AlgodHTTPError, tries=10, delay=1, logger=LOGGER)
+    def current_round(self):
+        return self.algod.status()["last-round"]
+
+    def wait_for_round(self, round_num):
+        """
+        Blocks until both algod and the indexer have ``round_num``.
+
+        :return: the latest round available on both
+        """
+        tip = self._wait_for_algod(round_num)
+        return min(tip, self._wait_for_indexer(round_num))
+
+    @retry(AlgodHTTPError, tries=10, delay=1, logger=LOGGER)
+    def _wait_for_algod(self, round_num):
+        while True:
+            # returns once the block after ``round_num - 1`` is committed, or
+            # after the node's long poll timeout
+            tip = self.algod.status_after_block(round_num - 1)["last-round"]
+            if tip >= round_num:
+                return tip
+
+    def _wait_for_indexer(self, round_num):
+        while True:
+            indexed = self.parser.current_round()
+            if indexed >= round_num:
+                return indexed
+            time.sleep(self.indexer_poll_interval)
@@ -1,4 +1,7 @@
 import structlog
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from operator import mod
 
 from algosdk.v2client.indexer import error
@@ -6,11 +9,45 @@ from algosdk.v2client.indexer import error
 from core.factory import IndexParserFactory
 from core.index_utils_base import IndexParserBase
 
-from algorand.algoconn import IndexerBase
+from algorand.algoconn import IndexerBase, get_context
+from algorand.block_store import BlockStore
+from algorand.follower import AlgodBlockFollower, BlockFollower
+from algorand.metadata_cache import metadata_cache
+from core.settings import settings
 from decorators import retry
+from utils.cache import LRUCache
 
 LOGGER = structlog.get_logger()
 
+STORE_READ_ROUNDS = 1000
+""" Rounds read from the block store per bulk read in parse_blocks """
+
+SEARCH_SHARD_ROUNDS = 10000
+""" Rounds covered by each shard of search_blocks """
+
+SEARCH_PAGE_LIMIT = 1000
+""" Transactions requested per page of the indexer transaction search """
+
+DELETED_ASSETS_ITEMS = 10000
+""" Deleted assets remembered so later blocks need not look them up again """
+
+ASSET_LOOKUP_WORKERS = 8
+""" Concurrent asset lookups made while parsing a block """
+
+BLOCK_TXN_BYTES = 2048
+""" Estimated footprint of one block transaction, used to size cached blocks """
+
+
+def _block_size(block):
+    """
+    Approximate in-memory footprint of a block, used by the block cache.
+    Estimated from the transaction count, inner transactions included, so
+    blocks are not serialized just to be measured.
+    """
+    txns = block.get("transactions", [])
+    count = sum(1 + len(txn.get("inner-txns", ())) for txn in txns)
+    return (1 + count) * BLOCK_TXN_BYTES
+
 
 @IndexParserFactory.register("algo")
 class IndexParser(IndexerBase, IndexParserBase):
@@ -18,8 +55,55 @@ class IndexParser(IndexerBase, IndexParserBase):
     For blockchain queries related to assets.
     """
 
-    def __init__(self, testnet=False):
-        IndexerBase.__init__(self, testnet=testnet)
+    def __init__(
+        self,
+        testnet=False,
+        indexer=None,
+        backup=None,
+        cache_bytes=None,
+        block_store=None,
+        context=None,
+    ):
+        """
+        :param cache_bytes: approximate byte budget of the in-memory block
+            cache, defaults to ``settings.ALGORAND_BLOCK_CACHE_BYTES``. Zero
+            disables caching.
+        :param block_store: optional BlockStore, or path to one, which keeps
+            every fetched block on disk for later replay
+        :param context: ClientContext whose clients the parser uses
+        """
+        self.testnet = testnet
+        if cache_bytes is None:
+            cache_bytes = settings.ALGORAND_BLOCK_CACHE_BYTES
+        # finalized blocks are immutable, so they never need invalidating
+        self.block_cache = LRUCache(max_bytes=cache_bytes, sizeof=_block_size)
+        if isinstance(block_store, str):
+            block_store = BlockStore(block_store)
+        self.block_store = block_store
+        # deletion is final, so only deleted lookups are reused across blocks
+        self.deleted_assets = LRUCache(max_items=DELETED_ASSETS_ITEMS)
+        IndexerBase.__init__(
+            self, indexer=indexer, backup=backup, testnet=testnet, context=context
+        )
+
+    def _fetch_block(self, round_num: int) -> dict:
+        """
+        Fetches a block from the block cache, then the block store, and
+        finally the indexer on a miss.
+        """
+        block = self.block_cache.get(round_num)
+        if block is not None:
+            return block
+
+        if self.block_store is not None:
+            block = self.block_store.get(round_num)
+        if block is None:
+            block = self.indexer.block_info(round_num=round_num)
+            if self.block_store is not None:
+                self.block_store.put(round_num, block)
+
+        self.block_cache.put(round_num, block)
+        return block
 
     @retry(error.IndexerHTTPError, tries=20, delay=0.25, logger=LOGGER)
     def parse_block(self, round_num: int) -> dict:
@@ -31,42 +115,292 @@ class IndexParser(IndexerBase, IndexParserBase):
         :type round_num: int
         :returns: dictionary of asset id and direct ipfs address (cid) --> {asset_id: cid}
         """
+        return self._parse_block(round_num)
+
+    def parse_blocks(self, start: int, end: int, workers: int = 8, tries: int = 4):
+        """
+        Parses the blocks in ``[start, end)`` on a bounded worker pool and
+        yields their events in round order.
+
+        Rounds are fetched at most ``2 * workers`` ahead of the round being
+        yielded. A round which still fails after ``tries`` attempts is logged
+        and yielded with ``None`` in place of its events, so one bad block
+        does not stall the rest of the range. With a block store configured,
+        stored rounds are bulk read from disk instead of the indexer.
+
+        :param start: first round to parse
+        :type start: int
+        :param end: round to stop before
+        :type end: int
+        :param workers: number of concurrent block fetches
+        :type workers: int
+        :param tries: attempts per round before giving up on it
+        :type tries: int
+        :returns: generator of (round_num, events) tuples
+        """
+        parse = retry(error.IndexerHTTPError, tries=tries, delay=0.25, logger=LOGGER)(
+            self._parse_block
+        )
+        rounds = iter(range(start, end))
+        stored = {}
+        stored_until = start
+        pool = ThreadPoolExecutor(max_workers=workers)
+
+        def submit(round_num):
+            nonlocal stored_until
+            if self.block_store is not None and round_num >= stored_until:
+                stored_until = min(round_num + STORE_READ_ROUNDS, end)
+                stored.update(self.block_store.get_range(round_num, stored_until))
+            return round_num, pool.submit(parse, round_num, stored.pop(round_num, None))
+
         try:
-            block = self.indexer.block_info(round_num=round_num)
-            assets = []
-
-            # TODO: move this to asset parser, indexparser should just be a manager that directs
-            for i in block["transactions"]:
-                if i["tx-type"] == "acfg":
-                    if "created-asset-index" in i:  # asset creation
-                        if "url" in i["asset-config-transaction"]["params"]:
-                            url = i["asset-config-transaction"]["params"]["url"]
-                            if "ipfs" in url or "ardrive" in url or "tinyurl" in url:
-                                asa_id = i["created-asset-index"]
-                                assets.append(
-                                    {"id": asa_id, "event": "creation"}
-                                )  # TODO: include note field
-                    else:  # check if asset deletion or modification
-                        asset_id = i["asset-config-transaction"]["asset-id"]
-                        asset = self.indexer.search_assets(
-                            asset_id=asset_id, include_all=True
-                        )["assets"][0]
-                        if asset["deleted"]:  # deleted
-                            assets.append({"id": asset_id, "event": "deletion"})
-                        else:  # modified
-                            assets.append({"id": asset_id, "event": "modification"})
-                # elif i["tx-type"] == "axfer":
-                ## TODO
-
-            self.use_fallback = False
-            # FIXME: This function may be generalized a bit to allow for finding other
-            #  On chain events ie certain txns or aaplication calls. Asset specific activities
-            #  shoul be handled in the asset utils Asset Parser Class.
-            return assets
+            pending = deque(
+                submit(round_num) for round_num in islice(rounds, 2 * workers)
+            )
+            while pending:
+                round_num, future = pending.popleft()
+                for next_round in islice(rounds, 1):
+                    pending.append(submit(next_round))
 
-        except error.IndexerHTTPError as e:
-            self.use_fallback = True
-            raise e
+                try:
+                    events = future.result()
+                except Exception as e:
+                    LOGGER.error(
+                        "Failed to parse block",
+                        round=round_num,
+                        exception=type(e).__name__,
+                    )
+                    events = None
+                yield round_num, events
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def search_blocks(
+        self,
+        start: int,
+        end: int,
+        workers: int = 4,
+        shard_rounds: int = SEARCH_SHARD_ROUNDS,
+        tries: int = 4,
+    ):
+        """
+        Alternative to ``parse_blocks`` for historical scans. Instead of
+        downloading every block, acfg transactions in ``[start, end)`` are
+        found with the indexer transaction search. The range is split into
+        shards of ``shard_rounds`` rounds, each shard is paginated on a worker
+        pool, and the events are the same as ``parse_block`` would produce.
+
+        Only rounds with events are yielded, in round order. A shard whose
+        search still fails after ``tries`` attempts is re-scanned block by
+        block with ``parse_blocks``, and a round whose block fails as well is
+        yielded with ``None`` in place of its events, as ``parse_blocks``
+        does.
+
+        :param start: first round to scan
+        :type start: int
+        :param end: round to stop before
+        :type end: int
+        :param workers: number of shards searched concurrently
+        :type workers: int
+        :param shard_rounds: rounds covered by each shard
+        :type shard_rounds: int
+        :param tries: attempts per page before giving up on a shard
+        :type tries: int
+        :returns: generator of (round_num, events) tuples
+        """
+        search_page = retry(
+            error.IndexerHTTPError, tries=tries, delay=0.25, logger=LOGGER
+        )(self._search_acfg_page)
+        shards = iter(range(start, end, shard_rounds))
+        pool = ThreadPoolExecutor(max_workers=workers)
+
+        def submit(shard_start):
+            shard_end = min(shard_start + shard_rounds, end)
+            future = pool.submit(
+                self._search_acfg_shard, shard_start, shard_end, search_page
+            )
+            return shard_start, shard_end, future
+
+        try:
+            pending = deque(submit(shard) for shard in islice(shards, 2 * workers))
+            while pending:
+                shard_start, shard_end, future = pending.popleft()
+                for next_shard in islice(shards, 1):
+                    pending.append(submit(next_shard))
+
+                try:
+                    rounds = future.result()
+                except Exception as e:
+                    LOGGER.error(
+                        "Failed to search acfg transactions",
+                        min_round=shard_start,
+                        max_round=shard_end - 1,
+                        exception=type(e).__name__,
+                    )
+                    rounds = (
+                        (round_num, events)
+                        for round_num, events in self.parse_blocks(
+                            shard_start, shard_end, workers=workers, tries=tries
+                        )
+                        if events is None or events
+                    )
+                yield from rounds
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _search_acfg_shard(self, shard_start, shard_end, search_page) -> list:
+        """
+        Pages through the acfg transactions of ``[shard_start, shard_end)``
+        and classifies them round by round.
+
+        :returns: list of (round_num, events) tuples of the rounds with events
+        """
+        by_round = {}
+        next_page = None
+        while True:
+            response = search_page(shard_start, shard_end - 1, next_page)
+            for txn in response["transactions"]:
+                by_round.setdefault(txn["confirmed-round"], []).append(txn)
+            next_page = response.get("next-token")
+            if not next_page or not response["transactions"]:
+                break
+
+        rounds = []
+        for round_num, txns in sorted(by_round.items()):
+            events = self._classify_acfg_txns(txns)
+            metadata_cache.apply_events(events, round_num, testnet=self.testnet)
+            if events:
+                rounds.append((round_num, events))
+        return rounds
+
+    def _search_acfg_page(self, min_round, max_round, next_page=None) -> dict:
+        return self.indexer.search_transactions(
+            txn_type="acfg",
+            min_round=min_round,
+            max_round=max_round,
+            limit=SEARCH_PAGE_LIMIT,
+            next_page=next_page,
+        )
+
+    def follow(
+        self,
+        checkpoint_path=None,
+        start_round=None,
+        read_ahead=4,
+        long_poll=False,
+        algod=None,
+    ):
+        """
+        Tails the chain and yields asset events as new blocks land, see
+        ``BlockFollower``.
+
+        :param checkpoint_path: file used to persist the last processed round
+        :param start_round: round to start from when there is no checkpoint,
+            defaults to the current round
+        :param read_ahead: rounds fetched concurrently when behind the tip
+        :param long_poll: wait for new rounds with algod's wait-for-block
+            long poll instead of polling the indexer health endpoint
+        :param algod: algod client used for long polling, defaults to
+            the algod client of the parser's ClientContext
+        :returns: generator of event dicts
+        """
+        kwargs = {
+            "checkpoint_path": checkpoint_path,
+            "start_round": start_round,
+            "read_ahead": read_ahead,
+        }
+        if long_poll or algod is not None:
+            if algod is None:
+                context = self.context or get_context(self.testnet)
+                algod = context.algod
+            return AlgodBlockFollower(self, algod, **kwargs).follow()
+        return BlockFollower(self, **kwargs).follow()
+
+    def _parse_block(self, round_num: int, block: dict = None) -> list:
+        if block is None:
+            block = self._fetch_block(round_num)
+        assets = self._classify_acfg_txns(block["transactions"])
+        metadata_cache.apply_events(assets, round_num, testnet=self.testnet)
+
+        # FIXME: This function may be generalized a bit to allow for finding other
+        #  On chain events ie certain txns or aaplication calls. Asset specific activities
+        #  shoul be handled in the asset utils Asset Parser Class.
+        return assets
+
+    def _classify_acfg_txns(self, txns: list) -> list:
+        """
+        Classifies the acfg transactions of a block as asset creations,
+        deletions or modifications. Every asset touched by a non-creation
+        transaction is looked up once, however often it is reconfigured.
+
+        :param txns: block transactions, in block order
+        :returns: list of event dicts --> [{"id": asset_id, "event": event}]
+        """
+        acfg_txns = [i for i in txns if i["tx-type"] == "acfg"]
+        lookups = self._lookup_assets(
+            i["asset-config-transaction"]["asset-id"]
+            for i in acfg_txns
+            if "created-asset-index" not in i
+        )
+        assets = []
+
+        # TODO: move this to asset parser, indexparser should just be a manager that directs
+        for i in acfg_txns:
+            if "created-asset-index" in i:  # asset creation
+                if "url" in i["asset-config-transaction"]["params"]:
+                    url = i["asset-config-transaction"]["params"]["url"]
+                    if "ipfs" in url or "ardrive" in url or "tinyurl" in url:
+                        asa_id = i["created-asset-index"]
+                        assets.append(
+                            {"id": asa_id, "event": "creation"}
+                        )  # TODO: include note field
+            else:  # check if asset deletion or modification
+                asset_id = i["asset-config-transaction"]["asset-id"]
+                if lookups[asset_id]["deleted"]:  # deleted
+                    assets.append({"id": asset_id, "event": "deletion"})
+                else:  # modified
+                    assets.append({"id": asset_id, "event": "modification"})
+        # elif i["tx-type"] == "axfer":
+        ## TODO
+
+        return assets
+
+    def _lookup_assets(self, asset_ids) -> dict:
+        """
+        Resolves distinct asset ids concurrently. Only deleted assets are
+        remembered for later blocks, any other asset may still be destroyed
+        and is looked up again.
+
+        :returns: dict --> {asset_id: asset}
+        """
+        assets = {}
+        missing = []
+        for asset_id in dict.fromkeys(asset_ids):
+            asset = self.deleted_assets.get(asset_id)
+            if asset is None:
+                missing.append(asset_id)
+            else:
+                assets[asset_id] = asset
+
+        if len(missing) == 1:
+            found = [self._lookup_asset(missing[0])]
+        elif missing:
+            workers = min(len(missing), ASSET_LOOKUP_WORKERS)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                found = list(pool.map(self._lookup_asset, missing))
+        else:
+            found = []
+
+        for asset_id, asset in zip(missing, found):
+            if asset.get("deleted"):
+                self.deleted_assets.put(asset_id, asset)
+            assets[asset_id] = asset
+        return assets
+
+    def _lookup_asset(self, asset_id: int) -> dict:
+        return self.indexer.search_assets(asset_id=asset_id, include_all=True)[
+            "assets"
+        ][0]
 
     @retry(error.IndexerHTTPError, tries=20, delay=0.25, logger=LOGGER)
     def get_created_assets(self, round_num: int) -> list:
@@ -77,12 +411,7 @@ class IndexParser(IndexerBase, IndexParserBase):
         :type round_num: int
         :returns: dict --> {asset_id: cid}
         """
-        try:
-            block = self.indexer.block_info(round_num=round_num)
-            self.use_fallback = False
-        except error.IndexerHTTPError as e:
-            self.use_fallback = True
-            raise e
+        block = self._fetch_block(round_num)
 
         assets = []
         for i in block["transactions"]:
@@ -100,12 +429,7 @@ class IndexParser(IndexerBase, IndexParserBase):
         """
         Checks if an asset id contains a url using immutable file storage
         """
-        try:
-            response = self.indexer.search_assets(asset_id=asa_id)
-            self.use_fallback = False
-        except error.IndexerHTTPError as e:
-            self.use_fallback = True
-            raise e
+        response = self.indexer.search_assets(asset_id=asa_id)
 
         try:
             if len(response["assets"]):
@@ -126,20 +450,13 @@ class IndexParser(IndexerBase, IndexParserBase):
 
     @retry(error.IndexerHTTPError, tries=20, delay=0.25, logger=LOGGER)
     def current_round(self):
-        try:
-            round = self.indexer.health()["round"]
-            self.use_fallback = False
-            return round
-        except error.IndexerHTTPError as e:
-            self.use_fallback = True
-            raise e
-
         # algosdk.error.IndexerHTTPError: Limit Exceeded
+        return self.indexer.health()["round"]
 
     @retry(error.IndexerHTTPError, tries=20, delay=0.25, logger=LOGGER)
     def get_block_info(self, round_num):
         try:
-            block = self.indexer.block_info(round_num=round_num)
+            block = self._fetch_block(round_num)
         except error.IndexerHTTPError as e:
             raise e
         return block
@@ -0,0 +1,100 @@
+"""This module provides a process wide cache of resolved asset metadata, shared
+by every AssetParser and kept fresh by the asset events of IndexParser.
+"""
+import threading
+
+from core.settings import settings
+from utils.cache import LRUCache
+
+INVALIDATED_ITEMS = 100000
+""" Assets whose last invalidation round is remembered """
+
+SETTINGS_TTL = object()
+""" Default ttl of MetadataCache, which reads it from the settings """
+
+
+class MetadataCache:
+    """
+    Size bounded cache of asset metadata, keyed by network and asset id.
+
+    Every entry records the round of the last acfg transaction it was
+    resolved from. An entry is dropped when a modification or deletion of
+    its asset is seen in a later round, and in any case ``ttl`` seconds
+    after it was stored, so processes which do not follow the chain with an
+    IndexParser never serve metadata older than that. Invalidations which
+    arrive before the indexer has caught up are remembered, so older data is
+    never stored over them.
+    """
+
+    def __init__(self, max_items=None, ttl=SETTINGS_TTL):
+        """
+        :param ttl: seconds an entry is trusted for, None to never expire
+            entries, defaults to ``settings.ALGORAND_METADATA_CACHE_TTL``
+        """
+        if max_items is None:
+            max_items = settings.ALGORAND_METADATA_CACHE_ITEMS
+        if ttl is SETTINGS_TTL:
+            ttl = settings.ALGORAND_METADATA_CACHE_TTL
+        self.entries = LRUCache(max_items=max_items, ttl=ttl)
+        self.invalidated = LRUCache(max_items=INVALIDATED_ITEMS)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def key(asset_id, testnet=False):
+        return (bool(testnet), int(asset_id))
+
+    def get(self, asset_id, testnet=False):
+        """
+        :return: dict of the cached fields of the asset, empty on a miss
+        """
+        entry = self.entries.get(self.key(asset_id, testnet))
+        return dict(entry["fields"]) if entry else {}
+
+    def put(self, asset_id, round_num, fields, testnet=False):
+        """
+        Stores fields resolved from the acfg history up to ``round_num``.
+        Fields of an entry from the same round are merged, entries from older
+        rounds are replaced, and data older than a known invalidation is
+        dropped.
+        """
+        key = self.key(asset_id, testnet)
+        with self._lock:
+            if round_num < self.invalidated.get(key, -1):
+                return
+            entry = self.entries.get(key)
+            if entry is None or entry["round"] < round_num:
+                entry = {"round": round_num, "fields": {}}
+            elif entry["round"] > round_num:
+                return
+            entry["fields"] = dict(entry["fields"], **fields)
+            self.entries.put(key, entry)
+
+    def invalidate(self, asset_id, round_num, testnet=False):
+        """Drops the entry of an asset reconfigured or destroyed at ``round_num``."""
+        key = self.key(asset_id, testnet)
+        with self._lock:
+            if round_num > self.invalidated.get(key, -1):
+                self.invalidated.put(key, round_num)
+            entry = self.entries.get(key)
+            if entry is not None and entry["round"] < round_num:
+                self.entries.pop(key)
+
+    def apply_events(self, events, round_num, testnet=False):
+        """
+        Invalidates the assets modified or deleted by the events of a round,
+        as produced by ``IndexParser.parse_block``.
+        """
+        for event in events:
+            if event["event"] in ("modification", "deletion"):
+                self.invalidate(event["id"], round_num, testnet=testnet)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.invalidated.clear()
+
+
+metadata_cache = MetadataCache()
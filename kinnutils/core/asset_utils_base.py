@@ -40,10 +40,6 @@ class AssetParserBase(ABC):
     def all_metadata(self):
         pass
 
-    @abstractmethod
-    def process_asset_media(self):
-        pass
-
     @abstractmethod
     def get_all_asset_balances(self):
         pass
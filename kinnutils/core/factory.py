@@ -28,17 +28,21 @@ class AssetParserFactory:
         return inner_wrapper
 
     @classmethod
-    def get_asset_parser(self, network: str, **kwargs) -> AssetParserBase:
+    def get_asset_parser(self, network: str, context=None, **kwargs) -> AssetParserBase:
         """Factory command to create the AssetParser.
         This method gets the appropriate AssetParser class from the registry
         and creates an instance of it, while passing in the parameters
         given in ``kwargs``.
         Args:
             network (str): The name of the network to create.
+            context: Optional shared client context of the network, so many
+                instances reuse the same clients and pooled connections.
         """
         if network not in self.networks:
             logger.warning("AssetParser %s does not exist in the memory", network)
             return None
+        if context is not None:
+            kwargs["context"] = context
 
         asset_parser_class = self.networks[network]
         instance = asset_parser_class(**kwargs)
@@ -61,10 +65,12 @@ class IndexParserFactory:
         return inner_wrapper
 
     @classmethod
-    def get_index_parser(self, network: str, **kwargs) -> IndexParserBase:
+    def get_index_parser(self, network: str, context=None, **kwargs) -> IndexParserBase:
         if network not in self.networks:
             logger.warning("IndexParser %s does not exist in the memory", network)
             return None
+        if context is not None:
+            kwargs["context"] = context
 
         index_parser_class = self.networks[network]
         instance = index_parser_class(**kwargs)
@@ -87,10 +93,12 @@ class AccountFactory:
         return inner_wrapper
 
     @classmethod
-    def get_account_utils(self, network: str, **kwargs) -> AccountBase:
+    def get_account_utils(self, network: str, context=None, **kwargs) -> AccountBase:
         if network not in self.networks:
             logger.warning("Account %s does not exist in the memory", network)
             return None
+        if context is not None:
+            kwargs["context"] = context
 
         account_class = self.networks[network]
         instance = account_class(**kwargs)
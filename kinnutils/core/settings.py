@@ -1,6 +1,6 @@
 from dotenv import load_dotenv
 from pydantic import AnyHttpUrl, BaseSettings, validator
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 load_dotenv()
 
@@ -16,7 +16,42 @@ class Settings(BaseSettings):
     ALGORAND_INDEXER_HOST: AnyHttpUrl
     ALGORAND_INDEXER_FALLBACK: AnyHttpUrl
 
+    # extra indexer providers added to the pool alongside host and fallback
+    TESTNET_ALGORAND_INDEXER_ENDPOINTS: List[AnyHttpUrl] = []
+    ALGORAND_INDEXER_ENDPOINTS: List[AnyHttpUrl] = []
+
+    # client side rate limits in requests per second, shared by every thread.
+    # ALGORAND_INDEXER_RATE_LIMITS overrides the default for single endpoints,
+    # keyed by endpoint url.
+    ALGORAND_INDEXER_RATE_LIMIT: Optional[float] = None
+    ALGORAND_INDEXER_RATE_LIMITS: Dict[str, float] = {}
+    ALGORAND_NODE_RATE_LIMIT: Optional[float] = None
+
+    # keep-alive connection pools shared by the package's HTTP requests,
+    # hosts pooled and connections kept per host
+    HTTP_POOL_CONNECTIONS: int = 10
+    HTTP_POOL_MAXSIZE: int = 100
+
     IPFS_GATEWAY: AnyHttpUrl
+    # extra gateways tried after IPFS_GATEWAY, in the same format
+    IPFS_EXTRA_GATEWAYS: List[AnyHttpUrl] = []
+    # seconds before a slow gateway fetch is raced against the next gateway,
+    # unset to try gateways one at a time
+    IPFS_HEDGE_DELAY: Optional[float] = 0.5
+    # memory mapped gateway health table shared by every worker process
+    IPFS_GATEWAY_HEALTH_PATH: str = "/tmp/kinnutils_ipfs_gateways"
+
+    # content addressed cache of IPFS downloads, a size of 0 disables it
+    IPFS_CACHE_DIR: str = "~/.cache/kinnutils/ipfs"
+    IPFS_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+    # largest body a streamed asset download accepts, unset for no limit
+    IPFS_MAX_DOWNLOAD_BYTES: Optional[int] = 1024 * 1024 * 1024
+
+    ALGORAND_BLOCK_CACHE_BYTES: int = 64 * 1024 * 1024
+    ALGORAND_METADATA_CACHE_ITEMS: int = 10000
+    # seconds cached asset metadata is trusted for, unset to rely only on the
+    # invalidations of a running IndexParser
+    ALGORAND_METADATA_CACHE_TTL: Optional[float] = 60
 
     ALGORAND_INDEXER_FALLBACK: AnyHttpUrl
 
@@ -0,0 +1,79 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread safe least-recently-used cache.
+
+    The cache may be bounded by an approximate byte budget, measured with
+    ``sizeof``, and/or by an item count. Entries may optionally expire
+    ``ttl`` seconds after they were stored.
+    """
+
+    def __init__(self, max_bytes=None, max_items=None, ttl=None, sizeof=None):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.ttl = ttl
+        self.sizeof = sizeof or sys.getsizeof
+        self.nbytes = 0
+        self._data = OrderedDict()  # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                self._remove(key)
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            # never evict the whole cache for a single oversized entry
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size, expires_at)
+            self.nbytes += size
+            self._evict()
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def _remove(self, key):
+        value, size, _ = self._data.pop(key)
+        self.nbytes -= size
+        return value
+
+    def _evict(self):
+        while self._data and (
+            (self.max_bytes is not None and self.nbytes > self.max_bytes)
+            or (self.max_items is not None and len(self._data) > self.max_items)
+        ):
+            _, (_, size, _) = self._data.popitem(last=False)
+            self.nbytes -= size
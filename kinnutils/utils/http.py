@@ -0,0 +1,72 @@
+"""This module provides pooled keep-alive HTTP sessions, so repeated requests
+to a host reuse open connections instead of paying a new handshake each time.
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.settings import settings
+
+
+class SessionPool:
+    """
+    Thread safe source of requests Sessions which share one connection pool.
+
+    A requests Session is not safe to share between threads, so every
+    thread gets a Session of its own. All of them mount the same
+    HTTPAdapter, whose urllib3 pool manager keeps up to ``pool_maxsize``
+    keep-alive connections to each of the ``pool_connections`` most
+    recently used hosts, so a connection opened by one thread is reused by
+    the others.
+
+    ``request``, ``get`` and ``head`` mirror the ``requests`` functions, so a
+    pool can be used wherever a Session is expected.
+    """
+
+    def __init__(self, pool_connections=None, pool_maxsize=None):
+        if pool_connections is None:
+            pool_connections = settings.HTTP_POOL_CONNECTIONS
+        if pool_maxsize is None:
+            pool_maxsize = settings.HTTP_POOL_MAXSIZE
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize
+        )
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        """Session of the calling thread"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self.adapter)
+            session.mount("https://", self.adapter)
+            self._local.session = session
+        return session
+
+    def request(self, method, url, **kwargs):
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.session.get(url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.session.head(url, **kwargs)
+
+    def close(self):
+        """Closes the pooled connections, later requests open new ones."""
+        self.adapter.close()
+
+
+session_pool = SessionPool()
+
+
+def get(url, **kwargs):
+    """``requests.get`` over the process wide session pool"""
+    return session_pool.get(url, **kwargs)
+
+
+def head(url, **kwargs):
+    """``requests.head`` over the process wide session pool"""
+    return session_pool.head(url, **kwargs)
@@ -1,20 +1,65 @@
 import os
 import re
+import math
+import mmap
 import time
+import shutil
+import struct
+import hashlib
+import tempfile
+import queue
+import threading
 import magic
 import structlog
 import requests
 from io import BytesIO
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
 
 from requests.exceptions import ConnectionError
 from decorators import retry
 from core.settings import settings
+from utils import http
 
 
 IPFS_GATEWAY = settings.IPFS_GATEWAY
-EXTRA_IPFS_GATEWAYS = [IPFS_GATEWAY]
+EXTRA_IPFS_GATEWAYS = [IPFS_GATEWAY] + settings.IPFS_EXTRA_GATEWAYS
 LOGGER = structlog.get_logger()
 
+SNIFF_BYTES = 2048
+""" Bytes read from the start of a response to tell metadata from media """
+
+MAX_METADATA_BYTES = 1024 * 1024
+""" Largest JSON body kept by a sniff, larger bodies are dropped """
+
+BLOCKED_MARKERS = ("Gateway Time-out", "Cloudflare", "too many requests")
+""" Markers of gateway error pages served in place of the content """
+
+CACHE_LOW_WATERMARK = 0.9
+""" Share of the cache size cap an eviction brings the cache back down to """
+
+CACHE_SIZE_FILE = ".size"
+""" File of the disk cache holding its total size, shared by every process """
+
+FETCH_CHUNK_BYTES = 64 * 1024
+""" Bytes read at a time by hedged fetches, between checks for cancellation """
+
+HEALTH_SLOTS = 64
+""" Gateways tracked by the shared gateway health table """
+
+HEALTH_ALPHA = 0.2
+""" Weight of the latest request in the gateway latency and success EWMAs """
+
+DEFAULT_GATEWAY_LATENCY = 0.5
+""" Latency assumed for a gateway until it has served a request """
+
+BLOCK_COOLDOWN = 60
+""" Seconds a gateway is avoided after blocking or rate limiting a request """
+
 
 def contains_cid(path):
     p = r"Qm[1-9A-HJ-NP-Za-km-z]{44,}|b[A-Za-z2-7]{58,}|B[A-Z2-7]{58,}|z[1-9A-HJ-NP-Za-km-z]{48,}|F[0-9A-F]{50,}"
@@ -25,6 +70,10 @@ class IPFSGatewayError(Exception):
     pass
 
 
+class GatewayBlockedError(IPFSGatewayError):
+    """Raised when a gateway serves a Cloudflare or rate limit page"""
+
+
 class PinataPinningError(Exception):
     pass
 
@@ -45,6 +94,14 @@ class NonMediaHTTPLink(Exception):
     pass
 
 
+class FetchCancelled(Exception):
+    pass
+
+
+class AssetTooLargeError(Exception):
+    """Raised when a streamed download grows past its maximum size"""
+
+
 def get_mime(raw):
     """Helper function to quickly get the image MIME type"""
     mime = magic.from_buffer(raw)
@@ -65,21 +122,446 @@ def get_mime(raw):
     return False  # if file type unrecognized, returns false
 
 
+def is_blocked_page(content_type, head):
+    """
+    :param content_type: content type of the response
+    :param head: first bytes of the response body
+    :return: whether the response is a gateway error page, e.g. from
+        Cloudflare, served in place of the content
+    """
+    if "text" not in content_type and "html" not in content_type:
+        return False
+    text = head[:SNIFF_BYTES].decode("utf-8", "ignore")
+    return any(marker in text for marker in BLOCKED_MARKERS)
+
+
+def stream_response(req, sink, max_bytes=None, cancel=None):
+    """
+    Writes the body of a streamed response to ``sink`` chunk by chunk, so
+    it is never held in memory as a whole. Only the first chunk is checked
+    for a gateway error page.
+
+    :param req: response of a ``requests`` call made with ``stream=True``
+    :param sink: writable binary file object
+    :param max_bytes: largest body accepted, None for no limit
+    :param cancel: threading.Event which aborts the download once set
+    :raises AssetTooLargeError: the body is larger than ``max_bytes``
+    :return: tuple of the first chunk and the number of bytes written
+    """
+    length = req.headers.get("Content-Length")
+    if max_bytes is not None and length is not None and int(length) > max_bytes:
+        raise AssetTooLargeError(f"Content of {length} bytes exceeds {max_bytes}")
+
+    content_type = req.headers.get("Content-Type", "")
+    head = None
+    size = 0
+    for chunk in req.iter_content(chunk_size=FETCH_CHUNK_BYTES):
+        if cancel is not None and cancel.is_set():
+            raise FetchCancelled()
+        if head is None and chunk:
+            head = chunk
+            if is_blocked_page(content_type, head):
+                raise GatewayBlockedError("Failed to Request Content")
+        size += len(chunk)
+        if max_bytes is not None and size > max_bytes:
+            raise AssetTooLargeError(f"Content exceeds {max_bytes} bytes")
+        sink.write(chunk)
+    return head or b"", size
+
+
+class SniffedContent:
+    """
+    Outcome of a single streamed GET, see ``sniff_url``. ``content`` holds
+    the full body when it is JSON metadata of at most ``MAX_METADATA_BYTES``,
+    and is None otherwise.
+    """
+
+    def __init__(self, url, status_code, content_type, head, content=None):
+        self.url = url
+        self.status_code = status_code
+        self.content_type = content_type
+        self.head = head
+        self.content = content
+
+    @classmethod
+    def from_file(cls, url, f, max_json_bytes=MAX_METADATA_BYTES):
+        """
+        Sniffs a body stored in a binary file, e.g. in the disk cache. Only
+        its first ``SNIFF_BYTES`` are read, unless it is JSON of at most
+        ``max_json_bytes``.
+        """
+        head = f.read(SNIFF_BYTES)
+        content_type = magic.from_buffer(head, mime=True) if head else ""
+        sniffed = cls(url, 200, content_type, head)
+        if sniffed.is_json and os.fstat(f.fileno()).st_size <= max_json_bytes:
+            sniffed.content = head + f.read()
+        return sniffed
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def is_json(self):
+        if "json" in self.content_type:
+            return True
+        return self.content_type in ("text/plain", "application/octet-stream") and (
+            self.head.lstrip()[:1] in (b"{", b"[")
+        )
+
+    @property
+    def is_media(self):
+        return any(
+            kind in self.content_type for kind in ("image", "video", "animation")
+        )
+
+    @property
+    def is_blocked(self):
+        return is_blocked_page(self.content_type, self.head)
+
+
+def sniff_url(url, max_json_bytes=MAX_METADATA_BYTES, timeout=10):
+    """
+    Performs a single streamed GET of ``url``, following redirects, and
+    reads only the first ``SNIFF_BYTES`` of the body. The content type is
+    taken from the response headers, or detected from those first bytes
+    when the headers are missing or generic. The rest of the body is only
+    downloaded when it is JSON of at most ``max_json_bytes``, so media are
+    never transferred in full.
+
+    :return: SniffedContent
+    """
+    with http.get(url, stream=True, timeout=timeout, allow_redirects=True) as req:
+        chunks = req.iter_content(chunk_size=SNIFF_BYTES)
+        head = next(chunks, b"")
+
+        content_type = req.headers.get("Content-Type", "").split(";")[0].strip()
+        if content_type in ("", "application/octet-stream") and head:
+            content_type = magic.from_buffer(head, mime=True)
+
+        sniffed = SniffedContent(req.url, req.status_code, content_type, head)
+        if not sniffed.ok or not sniffed.is_json:
+            return sniffed
+
+        length = req.headers.get("Content-Length")
+        if length is not None and int(length) > max_json_bytes:
+            return sniffed
+        body = [head]
+        size = len(head)
+        for chunk in chunks:
+            size += len(chunk)
+            if size > max_json_bytes:
+                return sniffed
+            body.append(chunk)
+        sniffed.content = b"".join(body)
+        return sniffed
+
+
+class IPFSDiskCache:
+    """
+    Persistent, content addressed cache of IPFS downloads.
+
+    CIDs are immutable, so entries never go stale. Each entry is a file named
+    after the sha256 of its CID and path. Writes go to a temporary file which
+    is atomically renamed into place, so concurrent processes never read a
+    partial entry. Reads refresh the modification time of an entry, and once
+    the cache outgrows ``max_bytes`` the least recently used entries are
+    removed. The total size is kept in a file updated under an exclusive
+    ``flock``, so worker processes sharing the cache count each other's
+    writes. A ``max_bytes`` of 0 disables the cache.
+    """
+
+    def __init__(self, path=None, max_bytes=None):
+        if path is None:
+            path = settings.IPFS_CACHE_DIR
+        if max_bytes is None:
+            max_bytes = settings.IPFS_CACHE_MAX_BYTES
+        self.path = os.path.expanduser(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _entry(self, cid):
+        digest = hashlib.sha256(cid.encode()).hexdigest()
+        return os.path.join(self.path, digest[:2], digest)
+
+    def get(self, cid):
+        """
+        :param cid: CID, including any path within it
+        :return: the cached bytes, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        entry = self._entry(cid)
+        try:
+            with open(entry, "rb") as f:
+                content = f.read()
+            os.utime(entry)
+        except FileNotFoundError:  # missing, or evicted by another process
+            return None
+        return content
+
+    def open(self, cid):
+        """
+        :return: binary file object of the cached entry, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        entry = self._entry(cid)
+        try:
+            f = open(entry, "rb")
+            os.utime(entry)
+        except FileNotFoundError:
+            return None
+        return f
+
+    def put(self, cid, content):
+        if not self.enabled or len(content) > self.max_bytes:
+            return
+        self._store(cid, len(content), lambda f: f.write(content))
+
+    def put_file(self, cid, src, size):
+        """
+        Stores the ``size`` bytes of the seekable file object ``src`` without
+        reading them into memory.
+        """
+        if not self.enabled or size > self.max_bytes:
+            return
+        src.seek(0)
+        self._store(cid, size, lambda f: shutil.copyfileobj(src, f))
+
+    def _store(self, cid, size, write):
+        entry = self._entry(cid)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, entry)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._size_file() as f:
+            nbytes = f.read()
+            # estimate, recounted when missing and by every eviction
+            nbytes = int(nbytes) + size if nbytes else self._scan()[1]
+            if nbytes > self.max_bytes:
+                nbytes = self._evict()
+            self._write_size(f, nbytes)
+
+    @contextmanager
+    def _size_file(self):
+        """Holds the size file, locked against other threads and processes"""
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            path = os.path.join(self.path, CACHE_SIZE_FILE)
+            fd = os.open(path, os.O_RDWR | os.O_CREAT)
+            with os.fdopen(fd, "r+b") as f:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                yield f  # released when the file is closed
+
+    @staticmethod
+    def _write_size(f, nbytes):
+        f.seek(0)
+        f.truncate()
+        f.write(str(nbytes).encode())
+
+    def _scan(self):
+        """
+        :return: tuple of the entries, as (mtime, size, path) tuples, and
+            their total size
+        """
+        entries = []
+        for dirpath, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                if filename.endswith(".tmp") or filename == CACHE_SIZE_FILE:
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries, sum(size for _, size, _ in entries)
+
+    def _evict(self):
+        """
+        :return: total size of the entries left
+        """
+        entries, nbytes = self._scan()
+        target = self.max_bytes * CACHE_LOW_WATERMARK
+        for _, size, path in sorted(entries):
+            if nbytes <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            nbytes -= size
+        return nbytes
+
+    def clear(self):
+        with self._size_file() as f:
+            for _, _, path in self._scan()[0]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._write_size(f, 0)
+
+
+ipfs_cache = IPFSDiskCache()
+
+
+class GatewayHealth:
+    """
+    Health of the IPFS gateways, shared by every process on the host.
+
+    Each gateway has a fixed size record in a memory mapped file: a key
+    derived from its url, EWMAs of its latency and success rate, the number
+    of requests it served, and the time until which it is blocked after a
+    Cloudflare or rate limit response. The latency is NaN until the first
+    successful request seeds it. Updates take an exclusive ``flock``
+    on the file, so worker processes never lose each other's writes.
+    Gateways are ranked by latency divided by success rate, blocked
+    gateways last.
+    """
+
+    RECORD = struct.Struct("<QddQd")  # key, latency, success, count, blocked_until
+
+    def __init__(self, path=None):
+        self.path = path if path is not None else settings.IPFS_GATEWAY_HEALTH_PATH
+        self._map = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(gateway):
+        digest = hashlib.sha256(str(gateway).encode()).digest()
+        return int.from_bytes(digest[:8], "little") or 1  # 0 marks a free slot
+
+    def _open(self):
+        if self._map is None:
+            size = HEALTH_SLOTS * self.RECORD.size
+            self._file = open(self.path, "a+b")
+            if os.fstat(self._file.fileno()).st_size < size:
+                self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+        return self._map
+
+    @contextmanager
+    def _locked(self, exclusive=False):
+        """Holds the table, locked against other threads and processes"""
+        with self._lock:
+            table = self._open()
+            if fcntl is not None:
+                fcntl.flock(
+                    self._file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+                )
+            try:
+                yield table
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _slot(self, table, key, create=False):
+        for slot in range(HEALTH_SLOTS):
+            offset = slot * self.RECORD.size
+            slot_key = self.RECORD.unpack_from(table, offset)[0]
+            if slot_key == key:
+                return offset
+            if slot_key == 0:
+                if create:
+                    self.RECORD.pack_into(table, offset, key, math.nan, 1.0, 0, 0.0)
+                    return offset
+                return None
+        return None  # table full, the gateway stays untracked
+
+    def get(self, gateway):
+        """
+        :return: dict of the gateway's latency, success rate, request count
+            and blocked-until unix time, None if it was never used
+        """
+        with self._locked() as table:
+            offset = self._slot(table, self._key(gateway))
+            if offset is None:
+                return None
+            _, latency, success, count, blocked_until = self.RECORD.unpack_from(
+                table, offset
+            )
+        return {
+            "latency": None if math.isnan(latency) else latency,
+            "success": success,
+            "count": count,
+            "blocked_until": blocked_until,
+        }
+
+    def _update(self, gateway, elapsed=None, success=True, blocked=False):
+        with self._locked(exclusive=True) as table:
+            offset = self._slot(table, self._key(gateway), create=True)
+            if offset is None:
+                return
+            key, latency, rate, count, blocked_until = self.RECORD.unpack_from(
+                table, offset
+            )
+            if elapsed is not None:
+                latency = elapsed if math.isnan(latency) else latency
+                latency += HEALTH_ALPHA * (elapsed - latency)
+            rate += HEALTH_ALPHA * ((1.0 if success else 0.0) - rate)
+            if blocked:
+                blocked_until = time.time() + BLOCK_COOLDOWN
+            self.RECORD.pack_into(
+                table, offset, key, latency, rate, count + 1, blocked_until
+            )
+
+    def record_success(self, gateway, elapsed):
+        self._update(gateway, elapsed=elapsed)
+
+    def record_failure(self, gateway, blocked=False):
+        self._update(gateway, success=False, blocked=blocked)
+
+    def cost(self, gateway):
+        health = self.get(gateway)
+        if health is None:
+            return DEFAULT_GATEWAY_LATENCY
+        if health["blocked_until"] > time.time():
+            return float("inf")
+        latency = health["latency"]
+        if latency is None:
+            latency = DEFAULT_GATEWAY_LATENCY
+        return latency / max(health["success"], 0.01)
+
+    def rank(self, gateways):
+        """
+        :return: list of the gateways, healthiest first
+        """
+        return sorted(gateways, key=self.cost)
+
+
+gateway_health = GatewayHealth()
+
+
 class IPFSCacher():
     gateways = EXTRA_IPFS_GATEWAYS
+    cache = ipfs_cache
+    hedge_delay = settings.IPFS_HEDGE_DELAY
     _cid = None
-    _lockfile = "/tmp/ipfs_gateway"
-    _gindex = 0
+    health = gateway_health
+    _gateway = None
 
-    def __init__(self, cid_url):  # noqa
+    def __init__(self, cid_url, cache=None):  # noqa
         self._cid_path = cid_url
+        if cache is not None:
+            self.cache = cache
         if not self.cid:
             raise InvalidCIDError(f"{cid_url} does not contain a CID")
-
-        if not os.path.exists(self._lockfile):
-            self._update_lockfile()
-        else:
-            self._read_lockfile()
+        self._tried = set()
 
     @property
     def cid(self):
@@ -92,56 +574,169 @@ class IPFSCacher():
                 self._cid = ""
         return self._cid
 
+    @property
+    def gateway(self):
+        """Gateway of the last request, or the healthiest one before any"""
+        if self._gateway is None:
+            self._gateway = self.health.rank(self.gateways)[0]
+        return self._gateway
+
     @property
     def url(self):
-        return f"{self.gateways[self._gindex]}/{self.cid}"
+        return f"{self.gateway}/{self.cid}"
 
-    def _swap_gw(self):
+    def _next_gateway(self):
         """
-        Helper methods that increments the IPFS Gateway index to use for the
-        next asset download attempt.
+        Picks the healthiest gateway not yet tried for this CID, starting
+        over once every gateway has been tried.
         """
-        self._gindex += 1
-        self._gindex = self._gindex % len(self.gateways)
-        self._update_lockfile()
-
-    def _update_lockfile(self):
+        untried = [g for g in self.gateways if g not in self._tried]
+        if not untried:
+            self._tried.clear()
+            untried = self.gateways
+        self._gateway = self.health.rank(untried)[0]
+        self._tried.add(self._gateway)
+        return self._gateway
+
+    def fetch_content(self, force=False):
         """
-        Helper method to write IPFS Gateway Index to lockfile for next use.
+        Returns the content of the CID, from the local disk cache when it was
+        downloaded before, otherwise from a gateway.
+
+        :param force: download from a gateway even when the CID is cached
+        :return: bytes
         """
-        with open(self._lockfile, "w") as f:
-            f.write(f"{self._gindex}")
+        content = None if force else self.cache.get(self.cid)
+        if content is None:
+            if self.hedge_delay is not None and len(self.gateways) > 1:
+                content = self._hedged_download()
+            else:
+                content = self._download_content()
+            self.cache.put(self.cid, content)
+        return content
 
-    def _read_lockfile(self):
+    @retry(IPFSGatewayError, tries=2, delay=3, backoff=1, logger=LOGGER)
+    def _hedged_download(self):
         """
-        Helper method to read last used IPFS Gateway Index from lockfile
+        Downloads the CID from the healthiest gateway, racing it against the
+        next gateway whenever no gateway has sent its response headers within
+        ``hedge_delay`` seconds, or as soon as one fails. Once a gateway has
+        answered, slow bodies are waited for and only failures start another
+        gateway. The first good response wins and the downloads still running
+        are cancelled. If every gateway fails, the race is run once more after
+        a pause.
 
-        :return: int
+        :return: bytes
         """
+        pending = iter(self.health.rank(self.gateways))
+        results = queue.Queue()
+        cancel = threading.Event()
+        answered = object()
+
+        def fetch(gateway):
+            start = time.monotonic()
+            try:
+                content = self._fetch_from(
+                    gateway, cancel, lambda: results.put((gateway, answered, None))
+                )
+            except Exception as e:
+                self._record(gateway, start, e)
+                results.put((gateway, None, e))
+            else:
+                self._record(gateway, start)
+                results.put((gateway, content, None))
+
+        def start():
+            gateway = next(pending, None)
+            if gateway is None:
+                return 0
+            threading.Thread(target=fetch, args=(gateway,), daemon=True).start()
+            return 1
+
         try:
-            with open(self._lockfile, "r") as f:
-                self._gindex = int(f.read().strip())
-        except ValueError as e:
-            self._update_lockfile()
+            hedge_delay = self.hedge_delay
+            running = start()
+            while running:
+                try:
+                    gateway, content, exc = results.get(timeout=hedge_delay)
+                except queue.Empty:  # no response headers yet, race the next one
+                    running += start()
+                    continue
+
+                if content is answered:
+                    hedge_delay = None
+                    continue
+                running -= 1
+                if exc is None:
+                    LOGGER.info("IPFS Fetched Asset", gateway=gateway, cid=self.cid)
+                    self._gateway = gateway
+                    return content
+                LOGGER.error(
+                    "IPFS Fetch Error",
+                    gateway=gateway,
+                    cid=self.cid,
+                    exception=type(exc).__name__,
+                )
+                running += start()
+        finally:
+            cancel.set()
+        raise IPFSGatewayError("Failed to Request Content")
+
+    def _fetch_from(self, gateway, cancel, on_answer=None):
+        """
+        Streams the CID from one gateway, giving up once ``cancel`` is set.
+
+        :param on_answer: called once the gateway has sent a good status
+        :return: bytes
+        """
+        with http.get(f"{gateway}/{self.cid}", stream=True, timeout=10) as req:
+            if req.status_code == 429:
+                raise GatewayBlockedError("Rate Limited")
+            if not req.ok:
+                raise IPFSGatewayError("Content Request Failed")
+            if on_answer is not None:
+                on_answer()
+            content = BytesIO()
+            stream_response(req, content, cancel=cancel)
+        return content.getvalue()
+
+    def _record(self, gateway, start, exc=None):
+        """Records the outcome of a request started at ``start`` on ``gateway``"""
+        if exc is None:
+            self.health.record_success(gateway, time.monotonic() - start)
+        elif not isinstance(exc, FetchCancelled):
+            blocked = isinstance(exc, GatewayBlockedError)
+            self.health.record_failure(gateway, blocked=blocked)
 
     @retry(
         IPFSGatewayError, tries=len(EXTRA_IPFS_GATEWAYS), delay=3, backoff=1, logger=LOGGER
     )
-    def fetch_content(self):
+    def _download_content(self):
         """
         Method which performs https download of content from IPFS.
 
         This method attempts to detect various errors with fetching IPFS content
         and is decorated with retry to cycle through different gateway
-        providers.
+        providers, healthiest first.
 
         :return: bytes
         """
-        log_info = {"gateway": self.gateways[self._gindex], "cid": self.cid}
+        gateway = self._next_gateway()
+        start = time.monotonic()
+        try:
+            content = self._get_content({"gateway": gateway, "cid": self.cid})
+        except IPFSGatewayError as e:
+            self._record(gateway, start, e)
+            raise e
+        self._record(gateway, start)
+        return content
 
+    def _get_content(self, log_info):
         try:
-            self._swap_gw()
-            req = requests.get(self.url, timeout=10)
+            req = http.get(self.url, timeout=10)
+            if req.status_code == 429:
+                LOGGER.error("IPFS Fetch Error", status_code=429, **log_info)
+                raise GatewayBlockedError("Rate Limited")
             assert req.ok
         except ConnectionError as e:
             # let the retry handle this
@@ -170,7 +765,7 @@ class IPFSCacher():
                 or "too many requests" in contentstr
             ):
                 LOGGER.error("Blocked by CloudFlare", reason=contentstr, **log_info)
-                raise IPFSGatewayError("Failed to Request Content")
+                raise GatewayBlockedError("Failed to Request Content")
 
         log_info["mime"] = content_type
         log_info["status_code"] = req.status_code
@@ -178,40 +773,189 @@ class IPFSCacher():
 
         return content
 
+    def stream_content(self, sink, max_bytes=None, force=False):
+        """
+        Writes the content of the CID to ``sink`` without holding it in
+        memory, from the local disk cache when it was downloaded before,
+        otherwise streamed from gateways, healthiest first. A failed gateway
+        download is discarded from the sink before the next gateway is tried.
+        Downloads into a readable sink, from its start, are also cached.
+
+        :param sink: writable, seekable binary file object
+        :param max_bytes: largest content accepted, None for no limit
+        :param force: download from a gateway even when the CID is cached
+        :raises AssetTooLargeError: the content is larger than ``max_bytes``
+        :return: tuple of the first chunk of the content and its size
+        """
+        cached = None if force else self.cache.open(self.cid)
+        if cached is not None:
+            with cached:
+                size = os.fstat(cached.fileno()).st_size
+                if max_bytes is not None and size > max_bytes:
+                    raise AssetTooLargeError(f"Content exceeds {max_bytes} bytes")
+                head = cached.read(FETCH_CHUNK_BYTES)
+                sink.write(head)
+                shutil.copyfileobj(cached, sink)
+            return head, size
+
+        position = sink.tell()
+        head, size = self._stream_download(sink, position, max_bytes)
+        if position == 0 and sink.readable():
+            sink.flush()
+            self.cache.put_file(self.cid, sink, size)
+            sink.seek(size)
+        return head, size
+
+    @retry(
+        IPFSGatewayError, tries=len(EXTRA_IPFS_GATEWAYS), delay=3, backoff=1, logger=LOGGER
+    )
+    def _stream_download(self, sink, position, max_bytes=None):
+        sink.seek(position)
+        sink.truncate()
+        gateway = self._next_gateway()
+        log_info = {"gateway": gateway, "cid": self.cid}
+
+        start = time.monotonic()
+        try:
+            with http.get(self.url, stream=True, timeout=10) as req:
+                if req.status_code == 429:
+                    raise GatewayBlockedError("Rate Limited")
+                if not req.ok:
+                    raise IPFSGatewayError("Content Request Failed")
+                head, size = stream_response(req, sink, max_bytes=max_bytes)
+        except (
+            ConnectionError,
+            requests.exceptions.Timeout,
+            requests.exceptions.ChunkedEncodingError,
+        ) as e:
+            LOGGER.error("IPFS Fetch Error", exception=type(e).__name__, **log_info)
+            exc = IPFSGatewayError("Content Request Failed")
+            self._record(gateway, start, exc)
+            raise exc
+        except IPFSGatewayError as e:
+            LOGGER.error("IPFS Fetch Error", exception=type(e).__name__, **log_info)
+            self._record(gateway, start, e)
+            raise e
+
+        self._record(gateway, start)
+        LOGGER.info("IPFS Fetched Asset", size=size, **log_info)
+        return head, size
+
+    def sniff_content(self, max_json_bytes=MAX_METADATA_BYTES):
+        """
+        Sniffs the content of the CID with a single streamed GET, see
+        ``sniff_url``, cycling through gateways like ``fetch_content``. Cached
+        content is sniffed locally, and JSON bodies read in full are cached.
+
+        :return: SniffedContent
+        """
+        cached = self.cache.open(self.cid)
+        if cached is not None:
+            with cached:
+                return SniffedContent.from_file(self.url, cached, max_json_bytes)
+
+        sniffed = self._sniff_gateway(max_json_bytes)
+        if sniffed.content is not None:
+            self.cache.put(self.cid, sniffed.content)
+        return sniffed
+
+    @retry(
+        IPFSGatewayError,
+        tries=len(EXTRA_IPFS_GATEWAYS),
+        delay=3,
+        backoff=1,
+        logger=LOGGER,
+    )
+    def _sniff_gateway(self, max_json_bytes=MAX_METADATA_BYTES):
+        gateway = self._next_gateway()
+        log_info = {"gateway": gateway, "cid": self.cid}
+
+        start = time.monotonic()
+        try:
+            sniffed = sniff_url(self.url, max_json_bytes=max_json_bytes)
+        except (
+            ConnectionError,
+            requests.exceptions.Timeout,
+            requests.exceptions.ChunkedEncodingError,
+        ) as e:
+            LOGGER.error("IPFS Sniff Error", exception=type(e).__name__, **log_info)
+            exc = IPFSGatewayError("Content Request Failed")
+            self._record(gateway, start, exc)
+            raise exc
+
+        if sniffed.status_code == 429 or sniffed.is_blocked:
+            LOGGER.error("Blocked by CloudFlare", **log_info)
+            exc = GatewayBlockedError("Failed to Request Content")
+        elif not sniffed.ok:
+            LOGGER.error(
+                "IPFS Sniff Error", status_code=sniffed.status_code, **log_info
+            )
+            exc = IPFSGatewayError("Content Request Failed")
+        else:
+            self._record(gateway, start)
+            return sniffed
+        self._record(gateway, start, exc)
+        raise exc
+
     def get_mime(self, content):
         return get_mime(content)
 
 
 class DownloadedAsset:
     file: BytesIO = None
+    size = None
     _content = None
     _content_mime = None
     _cid = None
+    _head = None
+    _sink = None
+    _owns_sink = False
 
-    def __init__(self, url, force=False):
+    def __init__(self, url, force=False, stream=False, sink=None, max_bytes=None):
         """
         Init method for Download Asset class. The asset is immediately
         downloaded and important asset contexts are saved to the instance
         properties for later use.
+
+        By default the asset is held in memory. In streaming mode it is
+        written chunk by chunk to a temporary file, or to ``sink``, and
+        ``file`` is a read only memory map of it, so large videos never have
+        to fit in memory. Streamed assets should be closed when done with.
+
+        :param force: download the asset even when it is in the disk cache
+        :param stream: stream the asset to a temporary file
+        :param sink: writable, seekable binary file object to stream the
+            asset to, implies ``stream``. ``file`` is None unless the sink is
+            a readable file on disk
+        :param max_bytes: largest streamed asset accepted, defaults to
+            ``settings.IPFS_MAX_DOWNLOAD_BYTES``
         """
         # handle URL Shorteners and Arweave
         if "bit.ly" in url or "tinyurl" in url or "arweave.net" in url:
             # fetch head and final link
-            req = requests.head(url)
+            req = http.head(url)
             self.url = req.headers["Location"]
         else:
             self.url = url
 
-        self.fetch_content(force)
+        self.stream = stream or sink is not None
+        if self.stream:
+            if max_bytes is None:
+                max_bytes = settings.IPFS_MAX_DOWNLOAD_BYTES
+            self.max_bytes = max_bytes
+            self._owns_sink = sink is None
+            self._sink = tempfile.TemporaryFile() if sink is None else sink
+            try:
+                self.stream_content(force)
+                self._check_blocked(self._head)
+                self.file = self._map()
+            except BaseException:
+                self.close()
+                raise
+            return
 
-        if self.mime == "text/html":
-            content = str(self.raw_content)
-            if (
-                "Gateway Time-out" in content
-                or "Cloudflare" in content
-                or "too many requests" in content
-            ):
-                raise IPFSGatewayError("Failed to Request Content")
+        self.fetch_content(force)
+        self._check_blocked(self.raw_content[:SNIFF_BYTES])
         try:
             self.file = BytesIO(self.raw_content)
         except TypeError as e:
@@ -223,6 +967,41 @@ class DownloadedAsset:
             LOGGER.error("BytesIO Failure", mime=self.mime, url=url)
             raise e
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Unmaps a streamed asset and removes its temporary file"""
+        if isinstance(self.file, mmap.mmap):
+            self.file.close()
+        if self._owns_sink and self._sink is not None:
+            self._sink.close()
+            self._sink = None
+
+    def _check_blocked(self, head):
+        if self.mime == "text/html" and is_blocked_page(self.mime, head):
+            raise IPFSGatewayError("Failed to Request Content")
+
+    def _map(self):
+        """
+        :return: read only memory map of the streamed asset, None if the sink
+            is not a readable file
+        """
+        try:
+            self._sink.flush()
+            fileno = self._sink.fileno()
+            readable = self._sink.readable()
+        except (AttributeError, OSError, ValueError):
+            return None
+        if not readable:
+            return None
+        if not self.size:
+            return BytesIO()  # empty files cannot be mapped
+        return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+
     @property
     def cid(self):
         return self._cid
@@ -230,8 +1009,11 @@ class DownloadedAsset:
     @property
     def mime(self):
         if self._content_mime is None:
-            if self._content is None:
-                req = requests.head(self.url)
+            if self._head is not None:
+                mime = magic.Magic(mime=True)
+                self._content_mime = str(mime.from_buffer(self._head))
+            elif self._content is None:
+                req = http.head(self.url)
                 self._content_mime = req.headers["Content-Type"]
             else:
                 mime = magic.Magic(mime=True)
@@ -239,25 +1021,26 @@ class DownloadedAsset:
 
         return self._content_mime
 
-    def fetch_content(self):
+    def fetch_content(self, force=False):
         """
         Helper method to perform HTTP Download of the specified asset url.
 
         Depending on whether an IPFS CID is detected, this may use a standard
         HTTP get request, or the IPFSCacher class.
 
+        :param force: download from a gateway even when the CID is cached
         :return: None
         """
         log_info = {"url": self.url}
         starttime = time.time()
         if contains_cid(self.url):
             ipfc = IPFSCacher(self.url)
-            self._content = ipfc.fetch_content()
+            self._content = ipfc.fetch_content(force=force)
             self._cid = ipfc.cid
         else:
             log_info["mime"] = self.mime
             if "image" in self.mime or "animation" in self.mime:
-                rq = requests.get(self.url, allow_redirects=True)
+                rq = http.get(self.url, allow_redirects=True)
                 self._content = rq.content
             else:
                 LOGGER.warning("Unknown Http Link", **log_info)
@@ -266,14 +1049,52 @@ class DownloadedAsset:
         endtime = time.time()
         LOGGER.debug("Fetched Asset", elapsed=(endtime - starttime), **log_info)
 
+    def stream_content(self, force=False):
+        """
+        Streaming counterpart of ``fetch_content``, writes the asset to the
+        sink and keeps only its first chunk, for mime detection, in memory.
+
+        :param force: download from a gateway even when the CID is cached
+        :return: None
+        """
+        log_info = {"url": self.url}
+        starttime = time.time()
+        if contains_cid(self.url):
+            ipfc = IPFSCacher(self.url)
+            self._head, self.size = ipfc.stream_content(
+                self._sink, max_bytes=self.max_bytes, force=force
+            )
+            self._cid = ipfc.cid
+        else:
+            log_info["mime"] = self.mime
+            if "image" in self.mime or "animation" in self.mime:
+                with http.get(self.url, stream=True, allow_redirects=True) as rq:
+                    self._head, self.size = stream_response(
+                        rq, self._sink, max_bytes=self.max_bytes
+                    )
+            else:
+                LOGGER.warning("Unknown Http Link", **log_info)
+                raise NonMediaHTTPLink("Unknown Http Link")
+
+        endtime = time.time()
+        LOGGER.debug(
+            "Streamed Asset", elapsed=(endtime - starttime), size=self.size, **log_info
+        )
+
     def to_file(self, fpath):
         """Helper method to write the instance's downloaded bytes to file"""
         if self.file is not None:
             with open(fpath, "wb") as f:
-                f.write(self.file.getbuffer())
+                if isinstance(self.file, mmap.mmap):
+                    f.write(self.file)  # straight from the mapped pages
+                else:
+                    f.write(self.file.getbuffer())
 
     @property
     def raw_content(self):
+        """bytes, or the read only memory map of a streamed asset"""
+        if self.stream:
+            return self.file
         if self._content is None:
             self.fetch_content()
         return self._content
@@ -311,14 +1132,20 @@ class DownloadedAsset:
         return "image/" in self.mime
 
 
-def download_asset(media_url: str, force=False) -> DownloadedAsset:
+def download_asset(
+    media_url: str, force=False, stream=False, sink=None, max_bytes=None
+) -> DownloadedAsset:
     """
     Uses the Asset Media URL to create a Downloaded Asset class instance,
     which provides some extra context about the downloaded media.
 
     ::param media_url::
+    ::param stream:: stream the asset to disk instead of memory, see
+        DownloadedAsset
     ::return:: DownloadedAsset
     """
-    return DownloadedAsset(url=media_url, force=force)
+    return DownloadedAsset(
+        url=media_url, force=force, stream=stream, sink=sink, max_bytes=max_bytes
+    )
 
 
@@ -0,0 +1,71 @@
+import time
+import threading
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket which lets through ``rate`` requests per second
+    on average, with bursts of up to ``burst`` requests.
+
+    ``reserve`` claims a token and returns how long the caller must wait
+    before using it, so the bucket can be shared by threads and event loops
+    alike. ``acquire`` is the blocking shorthand.
+    """
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens=1):
+        """
+        Claims ``tokens`` from the bucket, going into debt if it is empty.
+
+        :return: seconds to wait before the claimed tokens may be used
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens=1):
+        """Blocks until ``tokens`` may be used."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    def penalize(self, seconds):
+        """
+        Empties the bucket and holds it empty for ``seconds``, for when the
+        provider reports its quota was exceeded anyway.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(key, rate, burst=None):
+    """
+    Returns the process wide TokenBucket for ``key``, typically an endpoint
+    address, creating it on first use. Every client of the same endpoint
+    shares one bucket, whichever thread or instance it runs in.
+    """
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None or bucket.rate != rate:
+            bucket = _buckets[key] = TokenBucket(rate, burst)
+        return bucket
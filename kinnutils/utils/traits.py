@@ -0,0 +1,235 @@
+"""This module provides a columnar index of collection traits, for computing
+trait frequencies and rarity of whole collections at once.
+"""
+import json
+import numpy as np
+
+MISSING = 0
+""" Code of a trait an asset does not have """
+
+RARITY_METHODS = ("score", "statistical")
+""" Supported ways of combining the trait frequencies of an asset """
+
+
+def _value_label(value):
+    """Hashable form of a trait value, lists and dicts are labeled by their json"""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, sort_keys=True)
+    return value
+
+
+def _value_key(value):
+    """
+    Dictionary key of a trait value. The type is part of the key, so values
+    which compare equal across types, like True and 1, get distinct codes.
+    """
+    return type(value).__name__, _value_label(value)
+
+
+class TraitIndex:
+    """
+    Dictionary encoded, NumPy backed index of the traits of a collection.
+
+    Every trait type is a column of a ``(assets, trait types)`` matrix of
+    int32 codes. Code 0 marks a missing trait, and codes from 1 index the
+    distinct values of the column, in order of first appearance. Frequencies,
+    rarity scores and trait queries all work on whole columns at a time.
+
+    Traits are the flat ``{trait_type: value}`` dicts produced by
+    ``AssetParser.normalize_traits``.
+    """
+
+    def __init__(self):
+        self.trait_types = []  # column order
+        self.values = []  # per column, distinct values, value of code c at c - 1
+        self._columns = {}  # trait_type -> column
+        self._codes_by_value = []  # per column, value key -> code
+        self._asset_ids = []
+        self._entries = ([], [], [])  # rows, columns and codes of set traits
+        self._codes = None
+
+    def __len__(self):
+        return len(self._asset_ids)
+
+    @classmethod
+    def from_traits(cls, items):
+        """
+        :param items: iterable of (asset_id, traits) pairs
+        """
+        index = cls()
+        for asset_id, traits in items:
+            index.add(asset_id, traits)
+        return index
+
+    @classmethod
+    def from_parsers(cls, parsers):
+        """
+        Builds the index of the normalized traits of AssetParsers.
+
+        :param parsers: iterable of AssetParser
+        """
+        return cls.from_traits(
+            (parser.asset_id, parser.normalize_traits(parser.all_metadata))
+            for parser in parsers
+        )
+
+    def add(self, asset_id, traits):
+        """Adds the traits of one asset, values of None count as missing."""
+        row = len(self._asset_ids)
+        rows, columns, codes = self._entries
+        for trait_type, value in traits.items():
+            if value is None:
+                continue
+            column = self._column(str(trait_type))
+            key = _value_key(value)
+            code = self._codes_by_value[column].get(key)
+            if code is None:
+                self.values[column].append(value)
+                code = self._codes_by_value[column][key] = len(self.values[column])
+            rows.append(row)
+            columns.append(column)
+            codes.append(code)
+        self._asset_ids.append(int(asset_id))
+        self._codes = None
+
+    def _column(self, trait_type):
+        column = self._columns.get(trait_type)
+        if column is None:
+            column = self._columns[trait_type] = len(self.trait_types)
+            self.trait_types.append(trait_type)
+            self.values.append([])
+            self._codes_by_value.append({})
+        return column
+
+    @property
+    def asset_ids(self):
+        return np.asarray(self._asset_ids, dtype=np.int64)
+
+    @property
+    def codes(self):
+        """``(assets, trait types)`` int32 matrix of value codes"""
+        if self._codes is None:
+            codes = np.zeros((len(self), len(self.trait_types)), dtype=np.int32)
+            rows, columns, values = self._entries
+            codes[rows, columns] = values
+            self._codes = codes
+        return self._codes
+
+    def counts(self, trait_type):
+        """
+        :return: array of the number of assets per code of a trait type,
+            the count of assets missing the trait first
+        """
+        column = self._columns.get(str(trait_type))
+        if column is None:
+            return np.array([len(self)], dtype=np.int64)
+        return np.bincount(
+            self.codes[:, column], minlength=len(self.values[column]) + 1
+        )
+
+    def frequencies(self, trait_type):
+        """
+        :return: dict --> {value: share of assets}, None for the share of
+            assets missing the trait, lists and dicts keyed by their json.
+            Values equal as dict keys, like True and 1, share one entry with
+            their combined share, and are told apart by ``counts``.
+        """
+        shares = self.counts(trait_type) / max(len(self), 1)
+        values = [None]
+        column = self._columns.get(str(trait_type))
+        if column is not None:
+            values += self.values[column]
+        frequencies = {}
+        for value, share in zip(values, shares):
+            if share:
+                label = _value_label(value)
+                frequencies[label] = frequencies.get(label, 0.0) + float(share)
+        return frequencies
+
+    def frequency_matrix(self):
+        """
+        :return: ``(assets, trait types)`` float matrix of the share of the
+            collection which has the same value as each asset, per trait
+        """
+        matrix = np.empty(self.codes.shape, dtype=np.float64)
+        for column, trait_type in enumerate(self.trait_types):
+            shares = self.counts(trait_type) / len(self)
+            matrix[:, column] = shares[self.codes[:, column]]
+        return matrix
+
+    def rarity_scores(self, method="score", include_missing=True):
+        """
+        Rarity of every asset, higher is rarer.
+
+        ``score`` sums the inverse frequencies of the traits of an asset,
+        ``statistical`` sums their negative log, which ranks assets like the
+        product of their frequencies.
+
+        :param include_missing: whether lacking a trait counts as having
+            the value "missing" of that trait
+        :return: float array aligned with ``asset_ids``
+        """
+        if method not in RARITY_METHODS:
+            raise ValueError(f"unknown rarity method {method}")
+        if not len(self):
+            return np.zeros(0, dtype=np.float64)
+
+        frequencies = self.frequency_matrix()
+        if method == "score":
+            contributions = 1 / frequencies
+        else:
+            contributions = -np.log(frequencies)
+        if not include_missing:
+            contributions[self.codes == MISSING] = 0
+        return contributions.sum(axis=1)
+
+    def ranks(self, method="score", include_missing=True):
+        """
+        :return: int array of rarity ranks aligned with ``asset_ids``, 1 for
+            the rarest asset, tied assets share the best rank
+        """
+        scores = self.rarity_scores(method, include_missing)
+        descending = -np.sort(scores)[::-1]
+        return np.searchsorted(descending, -scores, side="left") + 1
+
+    def rarest(self, count=10, method="score", include_missing=True):
+        """
+        :return: list of (asset_id, score) of the ``count`` rarest assets
+        """
+        scores = self.rarity_scores(method, include_missing)
+        order = np.argsort(-scores, kind="stable")[:count]
+        asset_ids = self.asset_ids
+        return [(int(asset_ids[i]), float(scores[i])) for i in order]
+
+    def mask(self, trait_type, value):
+        """
+        :return: boolean array of the assets which have ``value`` for
+            ``trait_type``, or which lack the trait when ``value`` is None
+        """
+        column = self._columns.get(str(trait_type))
+        if column is None:
+            return np.full(len(self), value is None)
+        if value is None:
+            code = MISSING
+        else:
+            code = self._codes_by_value[column].get(_value_key(value))
+            if code is None:
+                return np.zeros(len(self), dtype=bool)
+        return self.codes[:, column] == code
+
+    def assets_with(self, trait_type, value):
+        """
+        :return: array of the ids of the assets which have ``value`` for
+            ``trait_type``
+        """
+        return self.asset_ids[self.mask(trait_type, value)]
+
+    def select(self, traits):
+        """
+        :param traits: dict --> {trait_type: value}, every pair must match
+        :return: array of the ids of the matching assets
+        """
+        selected = np.ones(len(self), dtype=bool)
+        for trait_type, value in traits.items():
+            selected &= self.mask(trait_type, value)
+        return self.asset_ids[selected]
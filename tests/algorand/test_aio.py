@@ -0,0 +1,68 @@
+import json
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from algosdk.error import IndexerHTTPError
+from algosdk.v2client.indexer import IndexerClient
+
+from algorand.aio import AsyncIndexerBase
+from algorand.algoconn import IndexerPool
+
+
+class StubIndexerHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path.startswith("/v2/blocks/"):
+            status, body = 200, {"round": int(url.path.split("/")[-1])}
+        elif url.path == "/v2/assets":
+            status, body = 200, {"assets": [{"index": int(query["asset-id"][0])}]}
+        else:
+            status, body = 404, {"message": "no assets found"}
+
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_indexer():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubIndexerHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield IndexerClient("", f"http://127.0.0.1:{server.server_port}")
+    server.shutdown()
+
+
+def test_async_indexer_concurrent_lookups(stub_indexer):
+    async def lookups():
+        async with AsyncIndexerBase(pool=IndexerPool([stub_indexer])) as idxr:
+            blocks = await asyncio.gather(
+                *(idxr.block_info(round_num=r) for r in range(200))
+            )
+            asset = await idxr.search_assets(asset_id=42, include_all=True)
+        return blocks, asset
+
+    blocks, asset = asyncio.run(lookups())
+
+    assert [b["round"] for b in blocks] == list(range(200))
+    assert asset["assets"][0]["index"] == 42
+
+
+def test_async_indexer_raises_indexer_errors(stub_indexer):
+    async def lookup():
+        async with AsyncIndexerBase(pool=IndexerPool([stub_indexer])) as idxr:
+            await idxr.asset_balances(1)
+
+    with pytest.raises(IndexerHTTPError, match="no assets found"):
+        asyncio.run(lookup())
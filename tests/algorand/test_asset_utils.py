@@ -0,0 +1,227 @@
+import copy
+import json
+import time
+import base64
+import pytest
+
+from algorand.algoconn import IndexerPool
+from algorand.asset_utils import AssetParser
+from algorand.metadata_cache import MetadataCache, metadata_cache
+from core.settings import settings
+
+CREATOR = "7ZUECA7HFLZTXENRV24SHLU4AVPUTMTTDUFUBNBD64C73F3UHRTHAIOF6Q"
+
+
+def acfg_txn(asset_id, confirmed_round, note=None, **params):
+    txn = {
+        "id": f"TX{asset_id}-{confirmed_round}",
+        "tx-type": "acfg",
+        "confirmed-round": confirmed_round,
+        "round-time": 1600000000 + confirmed_round,
+        "asset-config-transaction": {
+            "asset-id": asset_id,
+            "params": dict(
+                {"creator": CREATOR, "decimals": 0, "total": 1, "name": "Kinn"},
+                **params,
+            ),
+        },
+    }
+    if note is not None:
+        txn["note"] = base64.b64encode(json.dumps(note).encode()).decode()
+    return txn
+
+
+@pytest.fixture(autouse=True)
+def clear_metadata_cache():
+    metadata_cache.clear()
+    yield
+    metadata_cache.clear()
+
+
+class FakeIndexer:
+    def __init__(self, history, tip=10**6):
+        self.history = history  # asset_id -> acfg txns, oldest first
+        self.tip = tip
+        self.served = 0
+
+    def health(self):
+        return {"round": self.tip}
+
+    def search_asset_transactions(
+        self,
+        asset_id,
+        txn_type=None,
+        min_round=None,
+        max_round=None,
+        next_page=None,
+        note_prefix=None,
+        limit=None,
+        **kwargs,
+    ):
+        if asset_id not in self.history:
+            raise KeyError(asset_id)
+        txns = [
+            copy.deepcopy(t)
+            for t in self.history[asset_id]
+            if (min_round is None or t["confirmed-round"] >= min_round)
+            and (max_round is None or t["confirmed-round"] <= max_round)
+            and (
+                note_prefix is None
+                or base64.b64decode(t.get("note", "")).startswith(note_prefix)
+            )
+        ]
+        offset = int(next_page or 0)
+        response = {"transactions": txns[offset : offset + limit]}
+        self.served += len(response["transactions"])
+        if offset + limit < len(txns):
+            response["next-token"] = str(offset + limit)
+        return response
+
+
+def test_parse_many_yields_results_and_skips_failures():
+    history = {
+        asset_id: [
+            acfg_txn(asset_id, 10, manager=CREATOR),
+            acfg_txn(
+                asset_id,
+                20,
+                note={"standard": "arc69", "description": f"asset {asset_id}"},
+                manager=CREATOR,
+            ),
+        ]
+        for asset_id in range(1, 31)
+    }
+    pool = IndexerPool([FakeIndexer(history)])
+
+    results = list(AssetParser.parse_many(list(range(1, 33)), concurrency=4, pool=pool))
+
+    assert sorted(r.asset_id for r in results) == list(range(1, 31))
+    first = next(r for r in results if r.asset_id == 1)
+    assert first.description == "asset 1"
+    assert first.asset_metadata["arc69"]["standard"] == "arc69"
+    assert not first.is_destroyed
+
+
+def test_acfg_history_is_paginated_newest_first():
+    history = [acfg_txn(7, 10, manager=CREATOR)] + [
+        acfg_txn(7, r, note={"standard": "arc69", "n": r}, manager=CREATOR)
+        for r in range(5000, 5000000, 2000)
+    ]
+    fake = FakeIndexer({7: history}, tip=5100000)
+    parser = AssetParser(7, pool=IndexerPool([fake]))
+
+    assert parser.latest_acfg_txn.params.round == 4999000
+    assert parser.arc69["n"] == 4999000
+    assert parser.asset_data.params.round == 10
+    assert fake.served < len(history) / 2  # only the recent windows were read
+
+    rounds = [t.params.round for t in parser.acfg_txns]
+    assert rounds == sorted((t["confirmed-round"] for t in history), reverse=True)
+
+
+def test_latest_arc69_is_found_with_note_prefix():
+    history = (
+        [acfg_txn(9, 10, manager=CREATOR)]
+        + [
+            acfg_txn(9, r, note={"other": r}, manager=CREATOR)
+            for r in range(100, 4900, 2)
+        ]
+        + [
+            acfg_txn(9, r, note={"standard": "arc69", "n": r}, manager=CREATOR)
+            for r in range(4900, 5000)
+        ]
+        + [acfg_txn(9, 5000, note={"other": 5000}, manager=CREATOR)]
+    )
+    fake = FakeIndexer({9: history}, tip=5000)
+    parser = AssetParser(9, pool=IndexerPool([fake]))
+
+    assert parser.arc69["n"] == 4999
+    assert fake.served < 300  # the 2400 older non-ARC69 notes were never read
+
+
+def test_latest_arc69_with_reordered_keys_is_not_missed():
+    history = [acfg_txn(9, 10, manager=CREATOR)] + [
+        acfg_txn(9, r, note={"standard": "arc69", "n": r}, manager=CREATOR)
+        for r in range(100, 400)
+    ]
+    history += [
+        acfg_txn(9, 400, note={"n": 400, "standard": "arc69"}, manager=CREATOR),
+        acfg_txn(9, 401, note={"other": 401}, manager=CREATOR),
+    ]
+    fake = FakeIndexer({9: history}, tip=5000)
+
+    assert AssetParser(9, pool=IndexerPool([fake])).arc69["n"] == 400
+
+
+def test_latest_arc69_of_busy_collection_reads_small_pages():
+    history = [acfg_txn(9, 10, manager=CREATOR)] + [
+        acfg_txn(9, r, note={"standard": "arc69", "n": r}, manager=CREATOR)
+        for r in range(1000, 5000, 2)
+    ]
+    fake = FakeIndexer({9: history}, tip=5000)
+
+    assert AssetParser(9, pool=IndexerPool([fake])).arc69["n"] == 4998
+    assert fake.served < 200  # the window's 2000 ARC69 notes were never read
+
+
+def test_second_arc69_prefix_only_scans_newer_rounds():
+    history = [acfg_txn(9, 10, manager=CREATOR)] + [
+        acfg_txn(9, r, note={"standard": "arc69", "n": r}, manager=CREATOR)
+        for r in range(100, 4000)
+    ]
+    compact = acfg_txn(9, 4500, manager=CREATOR)
+    note = json.dumps({"standard": "arc69", "n": 4500}, separators=(",", ":"))
+    compact["note"] = base64.b64encode(note.encode()).decode()
+    history.append(compact)
+    fake = FakeIndexer({9: history}, tip=5000)
+
+    assert AssetParser(9, pool=IndexerPool([fake])).arc69["n"] == 4500
+    assert fake.served < 150  # the oldest page, then nothing before round 4500
+
+
+def test_metadata_cache_is_shared_until_invalidated():
+    history = [
+        acfg_txn(5, 10, manager=CREATOR),
+        acfg_txn(5, 20, note={"standard": "arc69", "n": 20}, manager=CREATOR),
+    ]
+    fake = FakeIndexer({5: history}, tip=100)
+    pool = IndexerPool([fake])
+
+    assert AssetParser(5, pool=pool).to_pydantic().asset_metadata["arc69"]["n"] == 20
+    served = fake.served
+    assert AssetParser(5, pool=pool).to_pydantic().asset_metadata["arc69"]["n"] == 20
+    assert fake.served == served  # served from the cache
+
+    history.append(
+        acfg_txn(5, 30, note={"standard": "arc69", "n": 30}, manager=CREATOR)
+    )
+    metadata_cache.apply_events([{"id": 5, "event": "modification"}], 30)
+
+    assert AssetParser(5, pool=pool).arc69["n"] == 30
+    assert fake.served > served
+
+
+def test_metadata_cache_entries_expire_and_are_never_mutated():
+    history = [
+        acfg_txn(6, 10, manager=CREATOR),
+        acfg_txn(6, 20, manager="NEWMANAGER"),
+    ]
+    fake = FakeIndexer({6: history}, tip=100)
+    pool = IndexerPool([fake])
+    cache = MetadataCache(ttl=0.05)
+
+    first = AssetParser(6, pool=pool, cache=cache)
+    assert first.asset_data.params.manager == "NEWMANAGER"
+    assert first.creation_acfg_txn.params.manager == CREATOR
+
+    served = fake.served
+    AssetParser(6, pool=pool, cache=cache).latest_acfg_txn
+    assert fake.served == served
+    time.sleep(0.1)
+    AssetParser(6, pool=pool, cache=cache).latest_acfg_txn
+    assert fake.served > served  # expired, read from the indexer again
+
+
+def test_metadata_cache_expiry_can_be_disabled():
+    assert MetadataCache(ttl=None).entries.ttl is None
+    assert MetadataCache().entries.ttl == settings.ALGORAND_METADATA_CACHE_TTL
@@ -0,0 +1,34 @@
+from algorand.block_store import BlockStore
+from algorand.index_utils import IndexParser
+
+
+class FakeIndexer:
+    def __init__(self):
+        self.block_calls = 0
+
+    def block_info(self, round_num):
+        self.block_calls += 1
+        return {"round": round_num, "transactions": []}
+
+
+def test_block_store_roundtrip_and_range(tmp_path):
+    store = BlockStore(str(tmp_path / "blocks.db"))
+    store.put_many((r, {"round": r, "transactions": []}) for r in range(10, 20))
+
+    assert store.get(12) == {"round": 12, "transactions": []}
+    assert store.get(99) is None
+    assert 15 in store
+    assert sorted(store.get_range(15, 30)) == list(range(15, 20))
+
+
+def test_index_parser_serves_stored_blocks(tmp_path):
+    path = str(tmp_path / "blocks.db")
+    fake = FakeIndexer()
+    parser = IndexParser(indexer=fake, backup=fake, block_store=path)
+    list(parser.parse_blocks(1, 6, workers=2))
+    assert fake.block_calls == 5
+
+    replay = IndexParser(indexer=fake, backup=fake, block_store=path)
+    assert [r for r, _ in replay.parse_blocks(1, 6, workers=2)] == list(range(1, 6))
+    assert replay.get_block_info(3)["round"] == 3
+    assert fake.block_calls == 5
@@ -1,3 +1,20 @@
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from algosdk.error import IndexerHTTPError
+
+from algorand.algoconn import (
+    ClientContext,
+    IndexerBase,
+    IndexerPool,
+    SessionIndexerClient,
+    get_context,
+)
+
 
 ALGOD_STATUS_KEYS = ['catchpoint', 'catchpoint-acquired-blocks', 'catchpoint-processed-accounts', 'catchpoint-processed-kvs', 'catchpoint-total-accounts', 'catchpoint-total-blocks', 'catchpoint-total-kvs', 'catchpoint-verified-accounts', 'catchpoint-verified-kvs', 'catchup-time', 'last-catchpoint', 'last-round', 'last-version', 'next-version', 'next-version-round', 'next-version-supported', 'stopped-at-unsupported-round', 'time-since-last-round']
 
@@ -5,4 +22,87 @@ def test_get_algod(algodcli, request):
     status = algodcli.status()
     assert [k for k in status.keys()] == ALGOD_STATUS_KEYS
 
-    
\ No newline at end of file
+    
+
+class FlakyIndexer:
+    def __init__(self, fail=False, message="Limit Exceeded"):
+        self.fail = fail
+        self.message = message
+        self.calls = 0
+
+    def health(self):
+        self.calls += 1
+        if self.fail:
+            raise IndexerHTTPError(self.message)
+        return {"round": 1}
+
+
+def test_indexer_pool_opens_breaker_on_failing_endpoint(monkeypatch):
+    # always route to the first endpoint whose breaker is closed
+    monkeypatch.setattr(random, "choices", lambda endpoints, weights: endpoints)
+    bad, good = FlakyIndexer(fail=True), FlakyIndexer()
+    pool = IndexerPool([bad, good], failure_threshold=2, cooldown=60)
+
+    for _ in range(50):
+        try:
+            pool.health()
+        except IndexerHTTPError:
+            pass
+
+    assert bad.calls == 2
+    assert pool.endpoints[0].is_open
+    assert good.calls == 48
+
+
+def test_indexer_pool_ignores_request_errors():
+    client = FlakyIndexer(fail=True, message="no accounts found for address")
+    pool = IndexerPool([client], failure_threshold=1)
+
+    with pytest.raises(IndexerHTTPError):
+        pool.health()
+    assert not pool.endpoints[0].is_open
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.peers.add(self.client_address)
+        if self.path.startswith("/health"):
+            status, body = 200, {"round": 7}
+        else:
+            status, body = 404, {"message": "no assets found"}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_session_indexer_client_reuses_connections():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    server.peers = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = SessionIndexerClient("", f"http://127.0.0.1:{server.server_port}")
+
+    try:
+        assert [client.health()["round"] for _ in range(20)] == [7] * 20
+        with pytest.raises(IndexerHTTPError, match="no assets found"):
+            client.asset_info(1)
+    finally:
+        server.shutdown()
+
+    assert len(server.peers) == 1
+
+
+def test_indexer_base_shares_the_process_context():
+    first, second = IndexerBase(), IndexerBase()
+    assert first.pool is second.pool is get_context().pool
+
+    with ClientContext() as context:
+        assert IndexerBase(context=context).pool is context.pool
+        assert context.pool is not first.pool
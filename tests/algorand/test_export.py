@@ -0,0 +1,88 @@
+import json
+import datetime
+
+import numpy as np
+from algosdk import encoding
+
+from algorand.algoconn import IndexerPool
+from algorand.asset_utils import AssetParser
+from algorand.export import read_jsonl, time_shards
+
+
+def address(i):
+    return encoding.encode_address(i.to_bytes(32, "big"))
+
+
+def transfer(i):
+    return {
+        "id": f"TX{i}",
+        "tx-type": "axfer",
+        "confirmed-round": 100 + i // 3,
+        "round-time": 1000 + i // 3,  # three transactions per round
+        "sender": address(i % 5),
+        "asset-transfer-transaction": {
+            "asset-id": 3,
+            "amount": i,
+            "receiver": address(i % 7),
+        },
+    }
+
+
+class FakeIndexer:
+    def __init__(self, txns):
+        self.txns = txns
+
+    def search_asset_transactions(
+        self, asset_id, start_time, end_time, next_page=None, limit=None, **kwargs
+    ):
+        after = datetime.datetime.fromisoformat(start_time).timestamp()
+        before = datetime.datetime.fromisoformat(end_time).timestamp()
+        txns = [t for t in self.txns if after <= t["round-time"] <= before]
+        offset = int(next_page or 0)
+        end = offset + min(limit, 4)
+        response = {"transactions": txns[offset:end]}
+        if end < len(txns):
+            response["next-token"] = str(end)
+        return response
+
+
+def test_time_shards_cover_the_range():
+    assert time_shards(1000, 1010, 4) == [
+        (1000, 1003),
+        (1003, 1006),
+        (1006, 1009),
+        (1009, 1010),
+    ]
+    assert time_shards("1970-01-01T00:16:40Z", 1000, 4) == []
+
+
+def test_export_is_round_ordered_without_boundary_duplicates(tmp_path):
+    txns = [transfer(i) for i in range(90)]
+    parser = AssetParser(3, pool=IndexerPool([FakeIndexer(txns)]))
+    expected = [t for t in txns if 1002 <= t["round-time"] < 1025]
+
+    streamed = list(parser.iter_transactions_sharded(1002, 1025, shards=7, workers=3))
+    assert [t["id"] for t in streamed] == [t["id"] for t in expected]
+
+    count = parser.export_transactions(tmp_path / "txns.jsonl", 1002, 1025, shards=5)
+    with open(tmp_path / "txns.jsonl") as f:
+        assert [json.loads(line) for line in f] == expected
+    assert count == len(expected)
+
+    parser.export_transactions(tmp_path / "txns.npz", 1002, 1025, shards=5)
+    with np.load(tmp_path / "txns.npz") as columns:
+        assert columns["id"].tolist() == [t["id"].encode() for t in expected]
+        assert (np.diff(columns["round"].astype(np.int64)) >= 0).all()
+        assert columns["amount"].tolist() == list(range(6, 75))
+        assert columns["receiver"].shape == (len(expected), 32)
+
+
+def test_shards_are_spooled_to_disk():
+    txns = [transfer(i) for i in range(90)]
+    parser = AssetParser(3, pool=IndexerPool([FakeIndexer(txns)]))
+
+    shard = parser._get_time_shard(1002, 1010)
+    assert shard.fileno() >= 0 and shard.tell() == 0
+    expected = [t for t in txns if 1002 <= t["round-time"] < 1010]
+    assert list(read_jsonl(shard)) == expected
+    assert shard.closed
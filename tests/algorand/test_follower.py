@@ -0,0 +1,98 @@
+from itertools import islice
+
+from algorand.follower import AlgodBlockFollower, BlockFollower, Checkpoint
+
+
+class FakeParser:
+    def __init__(self, tip):
+        self.tip = tip
+        self.parsed = []
+
+    def current_round(self):
+        self.tip += 1
+        return self.tip
+
+    def parse_blocks(self, start, end, workers=1):
+        for round_num in range(start, end):
+            self.parsed.append(round_num)
+            yield round_num, [{"id": round_num, "event": "creation"}]
+
+
+def test_checkpoint_roundtrip(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "round"))
+    assert checkpoint.load() is None
+
+    checkpoint.save(42)
+    assert checkpoint.load() == 42
+
+
+def test_follower_resumes_from_checkpoint(tmp_path):
+    path = str(tmp_path / "round")
+    Checkpoint(path).save(9)
+    parser = FakeParser(tip=12)
+
+    events = list(islice(BlockFollower(parser, checkpoint_path=path), 3))
+
+    assert [e["round"] for e in events] == [10, 11, 12]
+    assert parser.parsed[0] == 10
+    assert Checkpoint(path).load() == 11
+
+
+def test_follower_checkpoints_empty_rounds(tmp_path):
+    path = str(tmp_path / "round")
+    Checkpoint(path).save(9)
+    parser = FakeParser(tip=20)
+    parse_blocks = parser.parse_blocks
+
+    def sparse_blocks(start, end, workers=1):
+        for round_num, events in parse_blocks(start, end, workers):
+            yield round_num, events if round_num == 15 else []
+
+    parser.parse_blocks = sparse_blocks
+    follower = BlockFollower(parser, checkpoint_path=path, checkpoint_interval=0)
+
+    assert next(iter(follower))["round"] == 15
+    assert Checkpoint(path).load() == 14
+
+
+class FakeAlgod:
+    def __init__(self, last_round):
+        self.last_round = last_round
+        self.waits = []
+
+    def status(self):
+        return {"last-round": self.last_round}
+
+    def status_after_block(self, round_num):
+        self.waits.append(round_num)
+        self.last_round = max(self.last_round, round_num + 1)
+        return {"last-round": self.last_round}
+
+
+def test_algod_follower_long_polls_for_new_rounds():
+    parser = FakeParser(tip=100)
+    algod = FakeAlgod(last_round=5)
+
+    events = list(islice(AlgodBlockFollower(parser, algod), 3))
+
+    assert [e["round"] for e in events] == [5, 6, 7]
+    assert algod.waits == [4, 5, 6]
+
+
+def test_algod_follower_waits_for_the_indexer_to_catch_up():
+    parser = FakeParser(tip=2)  # lags algod, catches up a round per check
+    algod = FakeAlgod(last_round=5)
+    ranges = []
+    parse_blocks = parser.parse_blocks
+
+    def record_range(start, end, workers=1):
+        ranges.append((start, end, parser.tip))
+        return parse_blocks(start, end, workers)
+
+    parser.parse_blocks = record_range
+    follower = AlgodBlockFollower(parser, algod, indexer_poll_interval=0)
+    events = list(islice(follower, 3))
+
+    assert [e["round"] for e in events] == [5, 6, 7]
+    assert ranges[0] == (5, 6, 5)  # nothing requested before it was indexed
+    assert all(end - 1 <= indexed for _, end, indexed in ranges)
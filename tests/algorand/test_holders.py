@@ -0,0 +1,146 @@
+from algosdk import encoding
+
+from algorand.algoconn import IndexerPool
+from algorand.asset_utils import AssetParser
+from algorand.holders import HolderSnapshot
+
+
+def address(i):
+    return encoding.encode_address(i.to_bytes(32, "big"))
+
+
+def axfer(round_num, signer, receiver, amount, asset_id=3, **fields):
+    transfer = dict(
+        {"asset-id": asset_id, "amount": amount, "receiver": address(receiver)},
+        **fields,
+    )
+    return {
+        "id": f"TX{round_num}-{signer}-{receiver}",
+        "tx-type": "axfer",
+        "confirmed-round": round_num,
+        "sender": address(signer),
+        "asset-transfer-transaction": transfer,
+    }
+
+
+class FakeIndexer:
+    def __init__(self, balances, txns=(), page_limit=3, tip=500, page_rounds=()):
+        self.balances = balances
+        self.txns = list(txns)
+        self.page_limit = page_limit
+        self.tip = tip
+        self.page_rounds = iter(page_rounds)  # current-round of each page
+
+    def health(self):
+        return {"round": self.tip}
+
+    def search_asset_transactions(
+        self, asset_id, txn_type, min_round, max_round, next_page=None, limit=None
+    ):
+        txns = [t for t in self.txns if min_round <= t["confirmed-round"] <= max_round]
+        offset = int(next_page or 0)
+        end = offset + min(limit, self.page_limit)
+        response = {"transactions": txns[offset:end]}
+        if end < len(txns):
+            response["next-token"] = str(end)
+        return response
+
+    def asset_balances(self, asset_id, limit=None, next_page=None, *args, **kwargs):
+        offset = int(next_page or 0)
+        end = offset + min(limit, self.page_limit)
+        response = {
+            "balances": self.balances[offset:end],
+            "current-round": next(self.page_rounds, 500),
+        }
+        if end < len(self.balances):
+            response["next-token"] = str(end)
+        return response
+
+
+def test_holder_snapshot_streams_pages(tmp_path):
+    amounts = [0, 5, 100, 7, 3, 100, 1]
+    balances = [
+        {"address": address(i), "amount": amount, "is-frozen": False}
+        for i, amount in enumerate(amounts)
+    ]
+    parser = AssetParser(3, pool=IndexerPool([FakeIndexer(balances)]))
+
+    assert list(parser.iter_asset_balances()) == balances
+    snapshot = parser.holder_snapshot()
+
+    assert snapshot.round == 500
+    assert snapshot.addresses.shape == (7, 32)
+    assert snapshot.total == 216
+    assert snapshot.holders == 6
+    assert [amount for _, amount in snapshot.top(3)] == [100, 100, 7]
+    assert snapshot.top(1)[0][0] in (address(2), address(5))
+    assert snapshot.balance_of(address(3)) == 7
+    assert snapshot.balance_of(address(99)) is None
+
+    stats = snapshot.stats()
+    assert stats["holders"] == 6 and stats["max"] == 100
+    assert stats["median"] == 6.0
+    assert 0 < stats["gini"] < 1
+    assert stats["top_10_share"] == 1.0
+
+    snapshot.save(tmp_path / "holders")
+    loaded = HolderSnapshot.load(tmp_path / "holders.npz")
+    assert (loaded.asset_id, loaded.round) == (3, 500)
+    assert (loaded.addresses == snapshot.addresses).all()
+    assert loaded.amounts.tolist() == amounts
+
+
+def test_holder_snapshot_applies_transfers_since_its_round():
+    amounts = [0, 5, 100, 7, 3, 100, 1]
+    balances = [{"address": address(i), "amount": a} for i, a in enumerate(amounts)]
+    app_call = {
+        "id": "APPCALL",
+        "tx-type": "appl",
+        "confirmed-round": 503,
+        "sender": address(9),
+        "inner-txns": [
+            axfer(503, 2, 10, 50),
+            axfer(503, 2, 11, 9, asset_id=4),
+        ],
+    }
+    txns = [
+        axfer(501, 1, 3, 5),
+        axfer(502, 10, 10, 0),  # opt in
+        app_call,
+        app_call,
+        axfer(504, 6, 6, 3, sender=address(4)),  # clawback
+        axfer(505, 5, 2, 0, **{"close-to": address(2), "close-amount": 100}),
+    ]
+    fake = FakeIndexer(balances, txns, tip=505)
+    parser = AssetParser(3, pool=IndexerPool([fake]))
+    snapshot = HolderSnapshot.from_balances(3, 500, balances)
+
+    updated = parser.update_holder_snapshot(snapshot)
+
+    assert updated.round == 505
+    assert updated.total == snapshot.total == 216
+    assert len(updated) == 7  # 5 closed out, 10 opted in
+    assert updated.balance_of(address(2)) == 150
+    assert updated.balance_of(address(3)) == 12
+    assert updated.balance_of(address(4)) == 0
+    assert updated.balance_of(address(5)) is None
+    assert updated.balance_of(address(6)) == 4
+    assert updated.balance_of(address(10)) == 50
+    assert updated.balance_of(address(11)) is None
+    assert parser.update_holder_snapshot(updated) is updated
+
+
+def test_holder_snapshot_counts_transfers_during_pagination_once():
+    # 1 sends 5 to 4 at round 501, 6 sends 1 to 0 at round 502, while the
+    # three pages are read at rounds 500, 501 and 502
+    listed = [0, 5, 100, 7, 8, 100, 0]
+    balances = [{"address": address(i), "amount": a} for i, a in enumerate(listed)]
+    txns = [axfer(501, 1, 4, 5), axfer(502, 6, 0, 1)]
+    fake = FakeIndexer(balances, txns, tip=502, page_rounds=[500, 501, 502])
+    parser = AssetParser(3, pool=IndexerPool([fake]))
+
+    snapshot = parser.holder_snapshot()
+
+    assert snapshot.round == 502
+    assert snapshot.amounts.tolist() == [1, 0, 100, 7, 8, 100, 0]
+    assert parser.update_holder_snapshot(snapshot) is snapshot
@@ -0,0 +1,177 @@
+import pytest
+
+from algosdk.error import IndexerHTTPError
+
+from algorand.index_utils import BLOCK_TXN_BYTES, IndexParser
+from algorand.metadata_cache import metadata_cache
+
+
+def acfg_creation(
+    asset_id, url="ipfs://QmecmcBoqQTjFK976z4YA24ALCnirNQt2X1WoCqAQVNVL1"
+):
+    return {
+        "tx-type": "acfg",
+        "created-asset-index": asset_id,
+        "asset-config-transaction": {"params": {"url": url}},
+    }
+
+
+def acfg_update(asset_id):
+    return {"tx-type": "acfg", "asset-config-transaction": {"asset-id": asset_id}}
+
+
+class FakeIndexer:
+    def __init__(self, blocks, bad_rounds=()):
+        self.blocks = blocks
+        self.bad_rounds = set(bad_rounds)
+        self.block_calls = 0
+        self.asset_calls = []
+        self.deleted = set()
+        self.search_fails = False
+
+    def block_info(self, round_num):
+        self.block_calls += 1
+        if round_num in self.bad_rounds:
+            raise IndexerHTTPError("Limit Exceeded")
+        return {"transactions": self.blocks.get(round_num, [])}
+
+    def search_transactions(
+        self, txn_type, min_round, max_round, limit=None, next_page=None
+    ):
+        if self.search_fails:
+            raise IndexerHTTPError("Limit Exceeded")
+        txns = [
+            dict(txn, **{"confirmed-round": round_num})
+            for round_num in range(min_round, max_round + 1)
+            for txn in self.blocks.get(round_num, [])
+            if txn["tx-type"] == txn_type
+        ]
+        offset = int(next_page or 0)
+        response = {"transactions": txns[offset : offset + 2]}
+        if offset + 2 < len(txns):
+            response["next-token"] = str(offset + 2)
+        return response
+
+    def search_assets(self, asset_id, include_all=False):
+        self.asset_calls.append(asset_id)
+        return {"assets": [{"index": asset_id, "deleted": asset_id in self.deleted}]}
+
+
+@pytest.fixture
+def blocks():
+    return {round_num: [acfg_creation(round_num * 10)] for round_num in range(1, 21)}
+
+
+def test_parse_blocks_yields_in_round_order(blocks):
+    fake = FakeIndexer(blocks)
+    parser = IndexParser(indexer=fake, backup=fake)
+
+    results = list(parser.parse_blocks(1, 21, workers=4))
+
+    assert [round_num for round_num, _ in results] == list(range(1, 21))
+    assert results[0][1] == [{"id": 10, "event": "creation"}]
+
+
+def test_parse_blocks_isolates_failed_rounds(blocks):
+    fake = FakeIndexer(blocks, bad_rounds={5})
+    parser = IndexParser(indexer=fake, backup=fake)
+
+    results = dict(parser.parse_blocks(1, 11, workers=4, tries=1))
+
+    assert results[5] is None
+    assert results[6] == [{"id": 60, "event": "creation"}]
+
+
+def test_block_views_share_one_download(blocks):
+    fake = FakeIndexer(blocks)
+    parser = IndexParser(indexer=fake, backup=fake)
+
+    parser.parse_block(3)
+    parser.get_created_assets(3)
+    parser.get_block_info(3)
+
+    assert fake.block_calls == 1
+
+
+def test_block_cache_is_sized_by_transaction_count(blocks):
+    fake = FakeIndexer(blocks)
+    # each block holds one transaction, so two blocks fit the budget
+    parser = IndexParser(indexer=fake, backup=fake, cache_bytes=4 * BLOCK_TXN_BYTES)
+
+    for round_num in (1, 2, 3, 3, 2, 1):
+        parser.parse_block(round_num)
+
+    assert fake.block_calls == 4
+
+
+def test_parse_block_looks_up_each_reconfigured_asset_once():
+    txns = [acfg_update(1), acfg_update(2), acfg_update(1), acfg_creation(3)]
+    fake = FakeIndexer({7: txns})
+    fake.deleted.add(2)
+    parser = IndexParser(indexer=fake, backup=fake)
+
+    events = parser.parse_block(7)
+
+    assert events == [
+        {"id": 1, "event": "modification"},
+        {"id": 2, "event": "deletion"},
+        {"id": 1, "event": "modification"},
+        {"id": 3, "event": "creation"},
+    ]
+    assert sorted(fake.asset_calls) == [1, 2]
+
+
+def test_parse_block_sees_a_destroy_in_the_following_round():
+    fake = FakeIndexer({r: [acfg_update(1)] for r in (7, 8, 9)})
+    parser = IndexParser(indexer=fake, backup=fake)
+
+    assert parser.parse_block(7) == [{"id": 1, "event": "modification"}]
+    fake.deleted.add(1)
+    assert parser.parse_block(8) == [{"id": 1, "event": "deletion"}]
+    assert parser.parse_block(9) == [{"id": 1, "event": "deletion"}]
+    assert fake.asset_calls == [1, 1]  # deletion is final, looked up once
+
+
+@pytest.fixture
+def clear_metadata_cache():
+    metadata_cache.clear()
+    yield
+    metadata_cache.clear()
+
+
+def test_parse_block_invalidates_cached_metadata(clear_metadata_cache):
+    metadata_cache.put(1, 3, {"_arc69": {"standard": "arc69"}})
+    metadata_cache.put(3, 3, {"_arc69": {"standard": "arc69"}})
+    fake = FakeIndexer({7: [acfg_update(1), acfg_creation(4)]})
+    parser = IndexParser(indexer=fake, backup=fake)
+
+    parser.parse_block(7)
+
+    assert metadata_cache.get(1) == {}
+    assert metadata_cache.get(3) == {"_arc69": {"standard": "arc69"}}
+
+
+def test_search_blocks_matches_parse_blocks(blocks):
+    blocks[4] = [acfg_update(40), {"tx-type": "pay"}, acfg_creation(41)]
+    del blocks[6]
+    fake = FakeIndexer(blocks)
+    parser = IndexParser(indexer=fake, backup=fake)
+
+    searched = list(parser.search_blocks(1, 21, workers=2, shard_rounds=7))
+    parsed = [(r, events) for r, events in parser.parse_blocks(1, 21) if events]
+
+    assert searched == parsed
+    assert fake.block_calls == 20  # only parse_blocks downloaded blocks
+
+
+def test_search_blocks_fallback_yields_the_same_rounds(blocks):
+    blocks[5] = [acfg_creation(50, url="https://example.com")]  # no events
+    fake = FakeIndexer(blocks, bad_rounds={9})
+    parser = IndexParser(indexer=fake, backup=fake)
+
+    searched = list(parser.search_blocks(1, 21, shard_rounds=7, tries=1))
+    fake.search_fails = True
+    rescanned = list(parser.search_blocks(1, 21, shard_rounds=7, tries=1))
+
+    assert 5 not in dict(searched)
+    assert rescanned == [(9, None) if r == 9 else (r, e) for r, e in searched]
@@ -0,0 +1,33 @@
+from utils.cache import LRUCache
+
+
+def test_lru_evicts_least_recently_used_by_bytes():
+    cache = LRUCache(max_bytes=30, sizeof=len)
+    cache.put(1, "a" * 10)
+    cache.put(2, "b" * 10)
+    cache.put(3, "c" * 10)
+    cache.get(1)
+
+    cache.put(4, "d" * 10)
+
+    assert 2 not in cache
+    assert cache.get(1) == "a" * 10
+    assert cache.nbytes == 30
+
+
+def test_lru_skips_oversized_entries():
+    cache = LRUCache(max_bytes=5, sizeof=len)
+    cache.put(1, "a" * 10)
+    assert len(cache) == 0
+
+
+def test_lru_max_items_and_ttl():
+    cache = LRUCache(max_items=2)
+    cache.put(1, "a")
+    cache.put(2, "b")
+    cache.put(3, "c")
+    assert 1 not in cache and len(cache) == 2
+
+    expiring = LRUCache(ttl=-1)
+    expiring.put(1, "a")
+    assert expiring.get(1) is None
@@ -0,0 +1,45 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.http import SessionPool
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.peers.add(self.client_address)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_session_pool_shares_connections_between_threads():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    server.peers = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    pool = SessionPool(pool_connections=1, pool_maxsize=1)
+    sessions = []
+
+    def fetch():
+        sessions.append(pool.session)
+        assert pool.get(url).content == b"ok"
+
+    try:
+        for _ in range(5):
+            thread = threading.Thread(target=fetch)
+            thread.start()
+            thread.join()
+        fetch()
+    finally:
+        pool.close()
+        server.shutdown()
+
+    assert len({id(session) for session in sessions}) == 6
+    assert sessions[-1] is pool.session
+    assert len(server.peers) == 1
@@ -7,4 +7,309 @@ ipfs:///QmecmcBoqQTjFK976z4YA24ALCnirNQt2X1WoCqAQVNVL1@arc3
 https://gateway.pinata.cloud/ipfs/QmU5SJ6Voi7jbMQwMJkPpedSg7jBMEub6KupczmXT3q2wG/AS028 - Rogue%E2%99%80 of the High Council of Alg.png
 """
 
-# TODO
\ No newline at end of file
+import os
+import json
+import time
+import threading
+from io import BytesIO
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import decorators
+from utils.ipfs import (
+    AssetTooLargeError,
+    DownloadedAsset,
+    GatewayBlockedError,
+    GatewayHealth,
+    IPFSCacher,
+    IPFSDiskCache,
+    sniff_url,
+    stream_response,
+)
+
+PNG = (
+    b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR"
+    + b"\x00\x00\x00\x10\x00\x00\x00\x10\x08\x06\x00\x00\x00"
+    + b"\x00" * 100000
+)
+METADATA = json.dumps({"name": "Kinn", "image": "ipfs://Qm"}).encode()
+CID = "QmecmcBoqQTjFK976z4YA24ALCnirNQt2X1WoCqAQVNVL1"
+
+
+class StubGatewayHandler(BaseHTTPRequestHandler):
+    routes = {
+        "/metadata.json": ("application/json", METADATA),
+        "/untyped.json": ("", METADATA),
+        "/image.png": ("image/png", PNG),
+        "/untyped.png": ("", PNG),
+        f"/{CID}/1.json": ("application/json", METADATA),
+        f"/{CID}/1.png": ("image/png", PNG),
+    }
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        time.sleep(self.server.delay)
+        if self.server.rate_limited:
+            self.server.rate_limited -= 1
+            self.send_response(429)
+            self.end_headers()
+            return
+        if self.path == "/moved":
+            self.send_response(302)
+            self.send_header("Location", "/metadata.json")
+            self.end_headers()
+            return
+
+        content_type, payload = self.routes[self.path]
+        self.send_response(200)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.flush()
+            time.sleep(self.server.body_delay)
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def gateway_health(tmp_path, monkeypatch):
+    health = GatewayHealth(str(tmp_path / "gateways"))
+    monkeypatch.setattr(IPFSCacher, "health", health)
+    return health
+
+
+def start_gateway(delay=0, body_delay=0):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGatewayHandler)
+    server.requests = []
+    server.delay = delay
+    server.body_delay = body_delay
+    server.rate_limited = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def gateway():
+    server = start_gateway()
+    yield server
+    server.shutdown()
+
+
+def test_sniff_keeps_only_json_bodies(gateway):
+    base = f"http://127.0.0.1:{gateway.server_port}"
+
+    metadata = sniff_url(f"{base}/moved")
+    assert metadata.is_json and metadata.content == METADATA
+    assert metadata.url.endswith("/metadata.json")
+
+    image = sniff_url(f"{base}/image.png")
+    assert image.is_media and not image.is_json and image.content is None
+    assert len(image.head) < len(PNG)
+
+    assert sniff_url(f"{base}/untyped.json").content == METADATA
+    assert sniff_url(f"{base}/untyped.png").content_type == "image/png"
+    assert sniff_url(f"{base}/metadata.json", max_json_bytes=10).content is None
+    assert gateway.requests == [
+        "/moved",
+        "/metadata.json",
+        "/image.png",
+        "/untyped.json",
+        "/untyped.png",
+        "/metadata.json",
+    ]
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = IPFSDiskCache(tmp_path, max_bytes=350)
+    for i in range(3):
+        cache.put(f"{CID}/{i}", bytes([i]) * 100)
+        os.utime(cache._entry(f"{CID}/{i}"), (i, i))
+    os.utime(cache._entry(f"{CID}/0"))  # most recently used
+
+    cache.put(f"{CID}/3", b"3" * 100)
+
+    assert cache.get(f"{CID}/0") == bytes([0]) * 100
+    assert cache.get(f"{CID}/1") is None
+    assert cache.get(f"{CID}/2") == bytes([2]) * 100
+    assert cache.get(f"{CID}/3") == b"3" * 100
+    assert not [f for _, _, fs in os.walk(tmp_path) for f in fs if ".tmp" in f]
+    assert IPFSDiskCache(tmp_path, max_bytes=0).get(f"{CID}/0") is None
+
+
+def test_disk_cache_size_is_shared_between_processes(tmp_path):
+    worker, other_worker = IPFSDiskCache(tmp_path, 350), IPFSDiskCache(tmp_path, 350)
+    for i in range(4):
+        (worker, other_worker)[i % 2].put(f"{CID}/{i}", bytes([i]) * 100)
+
+    _, nbytes = worker._scan()
+    assert nbytes <= 350
+    assert int((tmp_path / ".size").read_bytes()) == nbytes
+
+
+def test_sniffing_cached_media_reads_only_its_head(tmp_path, monkeypatch):
+    cache = IPFSDiskCache(tmp_path, max_bytes=10**6)
+    cache.put(f"{CID}/1.png", PNG)
+    cache.put(f"{CID}/1.json", METADATA)
+    monkeypatch.setattr(cache, "get", None)  # whole entries are never loaded
+
+    media = IPFSCacher(f"ipfs://{CID}/1.png", cache=cache).sniff_content()
+    metadata = IPFSCacher(f"ipfs://{CID}/1.json", cache=cache).sniff_content()
+
+    assert media.is_media and media.content is None
+    assert media.head == PNG[:2048]
+    assert metadata.is_json and metadata.content == METADATA
+
+
+def test_cacher_serves_repeated_fetches_from_disk(gateway, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        IPFSCacher, "gateways", [f"http://127.0.0.1:{gateway.server_port}"]
+    )
+    cache = IPFSDiskCache(tmp_path, max_bytes=1024 * 1024)
+
+    first = IPFSCacher(f"ipfs://{CID}/1.json", cache=cache).fetch_content()
+    again = IPFSCacher(f"ipfs://{CID}/1.json", cache=cache).fetch_content()
+    sniffed = IPFSCacher(f"ipfs://{CID}/1.json", cache=cache).sniff_content()
+
+    assert first == again == sniffed.content == METADATA
+    assert sniffed.is_json
+    assert gateway.requests == [f"/{CID}/1.json"]
+
+
+def test_streamed_asset_is_memory_mapped_and_size_bounded(
+    gateway, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(
+        IPFSCacher, "gateways", [f"http://127.0.0.1:{gateway.server_port}"]
+    )
+    monkeypatch.setattr(IPFSCacher, "cache", IPFSDiskCache(tmp_path / "cache", 10**6))
+
+    with DownloadedAsset(f"ipfs://{CID}/1.png", stream=True) as asset:
+        assert asset.size == len(PNG) and asset.mime == "image/png"
+        assert asset.file[:] == PNG
+        asset.to_file(tmp_path / "copy.png")
+    assert (tmp_path / "copy.png").read_bytes() == PNG
+    assert asset.file.closed
+
+    with open(tmp_path / "sink.png", "w+b") as sink:
+        DownloadedAsset(f"ipfs://{CID}/1.png", sink=sink).close()
+    assert (tmp_path / "sink.png").read_bytes() == PNG
+    assert gateway.requests == [f"/{CID}/1.png"]  # then served from the cache
+
+    with pytest.raises(AssetTooLargeError):
+        DownloadedAsset(f"ipfs://{CID}/1.png", stream=True, max_bytes=1000)
+
+
+def test_stream_response_checks_only_the_first_chunk():
+    class Response:
+        def __init__(self, chunks, content_type="text/html"):
+            self.chunks = chunks
+            self.headers = {"Content-Type": content_type}
+
+        def iter_content(self, chunk_size):
+            return iter(self.chunks)
+
+    with pytest.raises(GatewayBlockedError):
+        stream_response(Response([b"<h1>Cloudflare</h1>", b"..."]), BytesIO())
+
+    sink = BytesIO()
+    head, size = stream_response(Response([b"<p>fine</p>", b"Cloudflare"]), sink)
+    assert head == b"<p>fine</p>" and size == 21
+    assert sink.getvalue() == b"<p>fine</p>Cloudflare"
+
+    with pytest.raises(AssetTooLargeError):
+        stream_response(Response([b"a" * 10, b"b" * 10]), BytesIO(), max_bytes=15)
+
+
+def test_hedged_fetch_races_a_stalled_gateway(tmp_path, monkeypatch):
+    stalled, fast = start_gateway(delay=3), start_gateway()
+    monkeypatch.setattr(
+        IPFSCacher,
+        "gateways",
+        [f"http://127.0.0.1:{s.server_port}" for s in (stalled, fast)],
+    )
+    monkeypatch.setattr(IPFSCacher, "hedge_delay", 0.1)
+    cacher = IPFSCacher(f"ipfs://{CID}/1.json", cache=IPFSDiskCache(tmp_path, 0))
+
+    start = time.monotonic()
+    try:
+        assert cacher.fetch_content() == METADATA
+        assert time.monotonic() - start < 2
+        assert stalled.requests and fast.requests
+    finally:
+        stalled.shutdown()
+        fast.shutdown()
+
+
+def test_hedged_fetch_waits_for_a_gateway_that_answered(tmp_path, monkeypatch):
+    slow_body, spare = start_gateway(body_delay=0.5), start_gateway()
+    monkeypatch.setattr(
+        IPFSCacher,
+        "gateways",
+        [f"http://127.0.0.1:{s.server_port}" for s in (slow_body, spare)],
+    )
+    monkeypatch.setattr(IPFSCacher, "hedge_delay", 0.1)
+    cacher = IPFSCacher(f"ipfs://{CID}/1.json", cache=IPFSDiskCache(tmp_path, 0))
+
+    try:
+        assert cacher.fetch_content() == METADATA
+        assert slow_body.requests and not spare.requests
+    finally:
+        slow_body.shutdown()
+        spare.shutdown()
+
+
+def test_hedged_fetch_retries_when_every_gateway_failed(tmp_path, monkeypatch):
+    servers = [start_gateway(), start_gateway()]
+    for server in servers:
+        server.rate_limited = 1
+    monkeypatch.setattr(
+        IPFSCacher, "gateways", [f"http://127.0.0.1:{s.server_port}" for s in servers]
+    )
+    monkeypatch.setattr(decorators, "time", SimpleNamespace(sleep=lambda s: None))
+    cacher = IPFSCacher(f"ipfs://{CID}/1.json", cache=IPFSDiskCache(tmp_path, 0))
+
+    try:
+        assert cacher.fetch_content() == METADATA
+    finally:
+        for server in servers:
+            server.shutdown()
+
+
+def test_gateway_health_is_shared_and_ranks_gateways(tmp_path):
+    path = str(tmp_path / "shared")
+    worker, other_worker = GatewayHealth(path), GatewayHealth(path)
+    slow, fast, blocked, unused = "https://slow", "https://fast", "https://cf", "x"
+
+    for _ in range(3):
+        worker.record_success(slow, 2.0)
+        worker.record_success(fast, 0.1)
+    other_worker.record_success(blocked, 0.01)
+    other_worker.record_failure(blocked, blocked=True)
+    worker.record_failure(fast)
+
+    assert other_worker.get(fast)["count"] == 4
+    assert other_worker.get(fast)["success"] == pytest.approx(0.8)
+    assert worker.get(blocked)["blocked_until"] > time.time()
+    assert worker.get(unused) is None
+    assert worker.rank([blocked, slow, unused, fast]) == [fast, unused, slow, blocked]
+
+
+def test_gateway_latency_is_seeded_by_the_first_success(tmp_path):
+    health = GatewayHealth(str(tmp_path / "gateways"))
+    flaky, steady = "https://flaky", "https://steady"
+
+    health.record_failure(flaky)
+    assert health.get(flaky)["latency"] is None
+    health.record_success(flaky, 2.0)
+    health.record_success(steady, 2.0)
+
+    assert health.get(flaky)["latency"] == pytest.approx(2.0)
+    assert health.rank([flaky, steady]) == [steady, flaky]
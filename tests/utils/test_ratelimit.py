@@ -0,0 +1,35 @@
+import threading
+
+from utils.ratelimit import TokenBucket, get_bucket
+
+
+def test_token_bucket_allows_burst_then_spaces_requests():
+    bucket = TokenBucket(rate=10, burst=2)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert 0.09 < bucket.reserve() <= 0.1
+    assert 0.19 < bucket.reserve() <= 0.2
+
+
+def test_token_bucket_penalize_holds_bucket_empty():
+    bucket = TokenBucket(rate=10, burst=5)
+    bucket.penalize(1.0)
+    assert bucket.reserve() > 1.0
+
+
+def test_token_bucket_is_shared_across_threads():
+    bucket = get_bucket("http://indexer.test", rate=5, burst=1)
+    waits = []
+
+    def claim():
+        waits.append(bucket.reserve())
+
+    threads = [threading.Thread(target=claim) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert get_bucket("http://indexer.test", rate=5) is bucket
+    assert max(waits) > 1.7  # ten requests at five a second
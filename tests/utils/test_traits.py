@@ -0,0 +1,56 @@
+import numpy as np
+
+from utils.traits import TraitIndex
+
+COLLECTION = {
+    1: {"Background": "Blue", "Hat": "Crown"},
+    2: {"Background": "Blue", "Hat": "Cap"},
+    3: {"Background": "Blue"},
+    4: {"Background": "Red", "Hat": "Cap", "Eyes": ["Laser", "Gold"]},
+}
+
+
+def test_frequencies_and_queries():
+    index = TraitIndex.from_traits(COLLECTION.items())
+
+    assert index.codes.shape == (4, 3)
+    assert index.frequencies("Background") == {"Blue": 0.75, "Red": 0.25}
+    assert index.frequencies("Hat") == {None: 0.25, "Crown": 0.25, "Cap": 0.5}
+    assert index.assets_with("Hat", "Cap").tolist() == [2, 4]
+    assert index.assets_with("Hat", None).tolist() == [3]
+    assert index.assets_with("Eyes", ["Laser", "Gold"]).tolist() == [4]
+    assert index.assets_with("Hat", "Wizard").tolist() == []
+    assert index.select({"Background": "Blue", "Hat": "Cap"}).tolist() == [2]
+
+
+def test_trait_types_and_values_are_normalized():
+    index = TraitIndex.from_traits(
+        [(1, {7: True}), (2, {7: 1}), (3, {7: 1.0}), (4, {7: "1"})]
+    )
+
+    assert index.counts(7).tolist() == index.counts("7").tolist() == [0, 1, 1, 1, 1]
+    assert index.assets_with(7, True).tolist() == [1]
+    assert index.assets_with("7", 1).tolist() == [2]
+    assert index.counts("Hat").tolist() == [4]
+    assert index.frequencies("Hat") == {None: 1.0}
+
+
+def test_rarity_matches_trait_by_trait_computation():
+    index = TraitIndex.from_traits(COLLECTION.items())
+    trait_types = ["Background", "Hat", "Eyes"]
+
+    expected = []
+    for traits in COLLECTION.values():
+        score = 0
+        for trait_type in trait_types:
+            value = traits.get(trait_type)
+            same = sum(
+                1 for other in COLLECTION.values() if other.get(trait_type) == value
+            )
+            score += len(COLLECTION) / same
+        expected.append(score)
+
+    assert np.allclose(index.rarity_scores(), expected)
+    assert index.ranks().tolist() == [2, 4, 2, 1]  # 1 and 3 tie
+    assert [asset_id for asset_id, _ in index.rarest(2)] == [4, 1]
+    assert index.ranks(method="statistical")[3] == 1